@@ -1,3 +1,78 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from members.models import Member
+from courses.models import Course, Enrollment
+from devices.models import FaceModel, TrainingImage
+
+class CourseRevisionsFeedTest(TestCase):
+    url = "/api/courses/revisions/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Member.objects.create(username="service", email="service@example.com"))
+
+        student = Member.objects.create(username="student1", email="student1@example.com")
+        self.trained = Course.objects.create(course_code="CS101", course_name="Math")
+        self.stale = Course.objects.create(course_code="CS102", course_name="Physics")
+        self.untrained = Course.objects.create(course_code="CS103", course_name="Chemistry")
+        for course in (self.trained, self.stale, self.untrained):
+            Enrollment.objects.create(student=student, email=student.email, course=course)
+        Enrollment.objects.create(email="pending@example.com", course=self.trained)
+
+        self.trained.refresh_from_db()
+        FaceModel.objects.create(
+            course=self.trained, model_version=1, model_path="models/course.keras",
+            inverse_label_map="models/label_map.json", trained_revision=self.trained.revision,
+            engine="embedding"
+        )
+        FaceModel.objects.create(
+            course=self.stale, model_version=1, model_path="models/course.keras",
+            inverse_label_map="models/label_map.json", trained_revision=0
+        )
+
+    def test_feed_lists_every_course(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        feed = {course['id']: course for course in response.json()}
+        self.assertEqual(set(feed), {self.trained.id, self.stale.id, self.untrained.id})
+
+        trained = feed[self.trained.id]
+        self.assertEqual(trained['revision'], self.trained.revision)
+        self.assertEqual(trained['trained_revision'], self.trained.revision)
+        self.assertEqual(trained['engine'], "embedding")
+        # Email-only enrollments are not counted
+        self.assertEqual(trained['enrollment_count'], 1)
+        self.assertEqual(trained['image_count'], 0)
+
+        self.assertEqual(feed[self.stale.id]['engine'], "softmax")
+        self.assertIsNone(feed[self.untrained.id]['trained_revision'])
+        self.assertIsNone(feed[self.untrained.id]['engine'])
+
+    def test_image_count_counts_enrolled_students_images(self):
+        student = Member.objects.get(username="student1")
+        for name in ("a.jpg", "b.jpg"):
+            TrainingImage.objects.create(member=student, file_path=f"training_images/member_{student.id}/{name}")
+
+        feed = {course['id']: course for course in self.client.get(self.url).json()}
+
+        self.assertEqual(feed[self.trained.id]['image_count'], 2)
+        self.assertEqual(feed[self.trained.id]['enrollment_count'], 1)
+
+    def test_stale_filter(self):
+        response = self.client.get(self.url, {'stale': 'true'})
+
+        self.assertEqual(
+            sorted(course['id'] for course in response.json()),
+            sorted([self.stale.id, self.untrained.id])
+        )
+
+    def test_course_id_filter(self):
+        response = self.client.get(self.url, {'course_id': self.stale.id})
+
+        self.assertEqual([course['id'] for course in response.json()], [self.stale.id])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'course_id': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'page': 1}).status_code, 400)
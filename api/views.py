@@ -4,6 +4,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Count, F, OuterRef, Q, Subquery
 
 from members.models import Member
 from attendance.models import Attendance, Schedule
@@ -156,6 +157,34 @@ class CourseViewSet(ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'], url_path='revisions')
+    def revisions(self, request):
+        allowed_params = {"course_id", "stale"}
+        invalid_params = set(request.query_params.keys()) - allowed_params
+        if invalid_params:
+            raise ValidationError({param: "This parameter is not allowed." for param in invalid_params})
+
+        latest_model = FaceModel.objects.filter(course=OuterRef('pk')).order_by('-updated_at')
+        queryset = Course.objects.annotate(
+            trained_revision=Subquery(latest_model.values('trained_revision')[:1]),
+            engine=Subquery(latest_model.values('engine')[:1]),
+            enrollment_count=Count('enrollments', filter=Q(enrollments__student__isnull=False), distinct=True),
+            image_count=Count('enrollments__student__training_images', distinct=True)
+        ).order_by('id')
+
+        course_id = request.query_params.get('course_id')
+        if course_id:
+            if not course_id.isdigit():
+                raise ValidationError({"course_id": "Must be a valid integer."})
+            queryset = queryset.filter(id=int(course_id))
+
+        if request.query_params.get('stale', '').lower() in ('1', 'true'):
+            queryset = queryset.filter(Q(trained_revision__isnull=True) | Q(trained_revision__lt=F('revision')))
+
+        return Response(list(queryset.values(
+            'id', 'revision', 'trained_revision', 'engine', 'enrollment_count', 'image_count'
+        )))
     
 class DeviceViewSet(ModelViewSet):
     queryset = Device.objects.all().order_by('id')
@@ -16,4 +16,8 @@ class SchedulesDayOfWeekEnum(models.TextChoices):
 
 class DevicesStatusEnum(models.TextChoices):
     ACTIVE = "active"
-    INACTIVE = "inactive"
\ No newline at end of file
+    INACTIVE = "inactive"
+
+class FaceModelEngineEnum(models.TextChoices):
+    SOFTMAX = "softmax"
+    EMBEDDING = "embedding"
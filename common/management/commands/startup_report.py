@@ -0,0 +1,85 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter under -X importtime; loading the URLconf imports
+# every view module, the same as the first request to a web worker.
+PROBE = """
+import os, sys, time, resource, json
+start = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", {settings_module!r})
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+ready = time.perf_counter() - start
+if {with_pose!r}:
+    from common.utils import get_mtcnn
+    get_mtcnn()
+sys.stdout.write(json.dumps({{
+    "startup_seconds": ready,
+    "total_seconds": time.perf_counter() - start,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "torch_loaded": "torch" in sys.modules,
+}}))
+"""
+
+class Command(BaseCommand):
+    help = "Report Django process start time, peak RSS and the most expensive imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help="Number of imports to list")
+        parser.add_argument('--with-pose', action='store_true', help="Also load the MTCNN face-pose model")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        probe = PROBE.format(settings_module=settings.SETTINGS_MODULE, with_pose=options['with_pose'])
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            capture_output=True, text=True, cwd=str(settings.BASE_DIR)
+        )
+        if result.returncode != 0:
+            self.stderr.write(result.stderr[-2000:])
+            return
+
+        summary = json.loads(result.stdout.strip().splitlines()[-1])
+        imports = self._parse_importtime(result.stderr)
+        # Top-level imports only; their cumulative time includes everything they pull in
+        top_level = sorted(
+            (item for item in imports if item['depth'] == 0),
+            key=lambda item: item['cumulative_us'], reverse=True
+        )[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({**summary, "imports": top_level}, indent=2))
+            return
+
+        self.stdout.write(f"Startup: {summary['startup_seconds']:.2f}s, total {summary['total_seconds']:.2f}s")
+        self.stdout.write(f"Peak RSS: {summary['peak_rss_mb']:.1f} MB, torch loaded: {summary['torch_loaded']}")
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for item in top_level:
+            self.stdout.write(
+                f"{item['cumulative_us'] / 1000:>14.1f} {item['self_us'] / 1000:>9.1f}  {item['module']}"
+            )
+
+    @staticmethod
+    def _parse_importtime(output):
+        imports = []
+        for line in output.splitlines():
+            # "import time:       self [us] |  cumulative | imported package"
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            try:
+                self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+                imports.append({
+                    "module": name.strip(),
+                    "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                })
+            except ValueError:
+                continue
+        return imports
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+from django.conf import settings
+
+from common.utils import get_mtcnn, select_faces, classify_poses
+
+def decode_image(upload):
+    # Decode straight from the upload, nothing is written to MEDIA_ROOT
+    try:
+        upload.seek(0)
+        im = ImageOps.exif_transpose(Image.open(upload))
+        return im.convert('RGB') if im.mode != "RGB" else im
+    except Exception:
+        return None
+
+def letterbox(images, max_side):
+    # MTCNN only batches images of one size. Scaling keeps the aspect ratio and the
+    # padding goes bottom/right, so landmark angles are unchanged.
+    side = min(max_side, max(max(im.size) for im in images))
+    batch = np.zeros((len(images), side, side, 3), dtype=np.uint8)
+    for i, im in enumerate(images):
+        scale = min(1.0, side / max(im.size))
+        if scale < 1.0:
+            im = im.resize((max(1, round(im.width * scale)), max(1, round(im.height * scale))), Image.BILINEAR)
+        batch[i, :im.height, :im.width] = np.asarray(im)
+    return batch
+
+# Batched face-pose validation on a dedicated worker pool. Uploads are decoded
+# in memory, letterboxed to a common size and sent through MTCNN as one batch
+# per request (in batch_size chunks). The model stays loaded in the pool, so
+# web workers only wait on a future.
+class PoseEngine:
+    def __init__(self, max_workers=1, max_side=640, batch_size=16):
+        self.max_workers = max_workers
+        self.max_side = max_side
+        self.batch_size = batch_size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pose")
+            return self._executor
+
+    def _detect(self, batch):
+        return get_mtcnn().detect(batch, landmarks=True)
+
+    def validate(self, uploads):
+        images = [decode_image(upload) for upload in uploads]
+        decoded = [i for i, im in enumerate(images) if im is not None]
+        landmarks = np.full((len(uploads), 5, 2), np.nan)
+        probs = np.zeros(len(uploads))
+        errors = {i: "Cannot decode image" for i, im in enumerate(images) if im is None}
+
+        for start in range(0, len(decoded), self.batch_size):
+            indices = decoded[start:start + self.batch_size]
+            batch = letterbox([images[i] for i in indices], self.max_side)
+            try:
+                boxes, batch_probs, batch_landmarks = self._detect(batch)
+            except Exception as e:
+                errors.update({i: f"Error processing image: {str(e)}" for i in indices})
+                continue
+            landmarks[indices], probs[indices] = select_faces(boxes, batch_probs, batch_landmarks)
+
+        # One vectorised pass classifies every image in the request
+        results = classify_poses(landmarks, probs)
+        for i, error in errors.items():
+            results[i] = (False, error, 0.0)
+        return results
+
+    async def validate_async(self, uploads):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.validate, uploads)
+
+pose_engine = PoseEngine(
+    max_workers=getattr(settings, 'POSE_WORKERS', 1),
+    max_side=getattr(settings, 'POSE_MAX_SIDE', 640),
+    batch_size=getattr(settings, 'POSE_BATCH_SIZE', 16),
+)
@@ -1,3 +1,57 @@
-from django.test import TestCase
+import numpy as np
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .utils import select_faces, classify_poses
+
+def face(nose_x):
+    # Eyes 10px apart with the nose 5px below; moving the nose sideways turns the head
+    return [[0.0, 0.0], [10.0, 0.0], [nose_x, 5.0], [2.0, 9.0], [8.0, 9.0]]
+
+class ClassifyPosesTest(SimpleTestCase):
+    def test_frontal_left_and_right(self):
+        results = classify_poses([face(5.0), face(8.0), face(2.0)], [0.99, 0.99, 0.99])
+
+        self.assertEqual([pose for _, pose, _ in results], ["Frontal Face", "Left Profile", "Right Profile"])
+        self.assertTrue(all(is_valid for is_valid, _, _ in results))
+        self.assertAlmostEqual(results[0][2], 0.99)
+
+    def test_no_face(self):
+        landmarks = np.full((1, 5, 2), np.nan)
+
+        self.assertEqual(classify_poses(landmarks, [0.0]), [(False, "No face detected in the image", 0.0)])
+
+    def test_low_probability(self):
+        is_valid, message, confidence = classify_poses([face(5.0)], [0.5])[0]
+
+        self.assertFalse(is_valid)
+        self.assertIn("Low detection probability", message)
+        self.assertAlmostEqual(confidence, 0.5)
+
+class SelectFacesTest(SimpleTestCase):
+    def test_largest_confident_face_wins(self):
+        boxes = np.array([[0, 0, 10, 10], [0, 0, 50, 50], [0, 0, 80, 80]], dtype=float)
+        probs = np.array([0.99, 0.95, 0.5])
+        landmarks = np.stack([np.full((5, 2), value) for value in (1.0, 2.0, 3.0)])
+
+        selected, selected_probs = select_faces([boxes], [probs], [landmarks])
+
+        # The biggest box is below the threshold, so the larger confident face is used
+        np.testing.assert_array_equal(selected[0], np.full((5, 2), 2.0))
+        self.assertAlmostEqual(selected_probs[0], 0.95)
+
+    def test_most_confident_face_without_confident_faces(self):
+        boxes = np.array([[0, 0, 80, 80], [0, 0, 10, 10]], dtype=float)
+        probs = np.array([0.3, 0.6])
+        landmarks = np.stack([np.full((5, 2), value) for value in (1.0, 2.0)])
+
+        selected, selected_probs = select_faces([boxes], [probs], [landmarks])
+
+        np.testing.assert_array_equal(selected[0], np.full((5, 2), 2.0))
+        self.assertAlmostEqual(selected_probs[0], 0.6)
+
+    def test_image_without_face(self):
+        selected, selected_probs = select_faces([None], [None], [None])
+
+        self.assertTrue(np.isnan(selected[0]).all())
+        self.assertEqual(selected_probs[0], 0.0)
+        self.assertFalse(classify_poses(selected, selected_probs)[0][0])
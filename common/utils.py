@@ -1,22 +1,84 @@
-from facenet_pytorch import MTCNN
 from PIL import Image
 import numpy as np
 import os
+import threading
 
-mtcnn = MTCNN(
-    image_size=224,
-    min_face_size=20,
-    thresholds=[0.6, 0.7, 0.7],
-    factor=0.8,
-    device='cpu' 
-)
-
-def np_angle(a, b, c):
-    ba = np.array(a) - np.array(b)
-    bc = np.array(c) - np.array(b)
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    angle = np.arccos(cosine_angle)
-    return np.degrees(angle)
+_mtcnn = None
+_mtcnn_lock = threading.Lock()
+
+def get_mtcnn():
+    # facenet-pytorch pulls in PyTorch and the model weights, so only the process
+    # that actually checks poses pays for it, on first use
+    global _mtcnn
+    if _mtcnn is None:
+        with _mtcnn_lock:
+            if _mtcnn is None:
+                from facenet_pytorch import MTCNN
+                _mtcnn = MTCNN(
+                    image_size=224,
+                    min_face_size=20,
+                    thresholds=[0.6, 0.7, 0.7],
+                    factor=0.8,
+                    device='cpu' 
+                )
+    return _mtcnn
+
+MIN_FACE_PROB = 0.9
+
+def _angles_at(vertex, a, c):
+    # Angle at vertex between (a - vertex) and (c - vertex) for every row at once
+    ba = a - vertex
+    bc = c - vertex
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosine = np.einsum('...i,...i->...', ba, bc) / (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1))
+        return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+def select_faces(boxes_list, probs_list, landmarks_list, min_prob=MIN_FACE_PROB):
+    # Pick one face per image from MTCNN's ragged output: the largest face above
+    # min_prob (the student, not someone in the background), otherwise the most
+    # confident one. Images without a face get NaN landmarks and probability 0.
+    count = len(probs_list)
+    landmarks = np.full((count, 5, 2), np.nan)
+    probs = np.zeros(count)
+
+    for i, (boxes, face_probs, face_landmarks) in enumerate(zip(boxes_list, probs_list, landmarks_list)):
+        if boxes is None or face_probs is None or face_landmarks is None:
+            continue
+        boxes = np.asarray(boxes, dtype=float)
+        face_probs = np.asarray(face_probs, dtype=float)
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        confident = face_probs > min_prob
+        best = int(np.where(confident, areas, -np.inf).argmax()) if confident.any() else int(face_probs.argmax())
+        landmarks[i] = face_landmarks[best]
+        probs[i] = face_probs[best]
+
+    return landmarks, probs
+
+def classify_poses(landmarks, probs, min_prob=MIN_FACE_PROB):
+    # landmarks: (N, 5, 2) MTCNN points (eye, eye, nose, mouth, mouth), probs: (N,)
+    # Returns one (is_valid, pose or error message, confidence) per image.
+    landmarks = np.asarray(landmarks, dtype=float).reshape(-1, 5, 2)
+    probs = np.asarray(probs, dtype=float)
+
+    angR = _angles_at(landmarks[:, 1], landmarks[:, 0], landmarks[:, 2])
+    angL = _angles_at(landmarks[:, 0], landmarks[:, 1], landmarks[:, 2])
+    # Same thresholds as before; floor matches the old int() truncation of the angles
+    frontal = (
+        (np.floor(angR) >= 35) & (np.floor(angR) <= 56)
+        & (np.floor(angL) >= 35) & (np.floor(angL) <= 57)
+    )
+    poses = np.where(frontal, "Frontal Face", np.where(angR < angL, "Right Profile", "Left Profile"))
+    detected = ~np.isnan(landmarks).any(axis=(1, 2))
+
+    results = []
+    for pose, prob, has_face in zip(poses, probs, detected):
+        if not has_face:
+            results.append((False, "No face detected in the image", 0.0))
+        elif prob <= min_prob:
+            results.append((False, f"Invalid pose detected: Low detection probability ({prob:.2f})", float(prob)))
+        else:
+            results.append((True, str(pose), float(prob)))
+    return results
 
 def predFacePose(image_path):
     if not os.path.exists(image_path):
@@ -27,25 +89,10 @@ def predFacePose(image_path):
         if im.mode != "RGB": 
             im = im.convert('RGB')
 
-        bbox, probs, landmarks_list = mtcnn.detect(im, landmarks=True)
-
-        if landmarks_list is None or probs is None:
-            return False, "No face detected in the image"
-
-        for landmarks, prob in zip(landmarks_list, probs):
-            if prob > 0.9: 
-                angR = np_angle(landmarks[0], landmarks[1], landmarks[2])  
-                angL = np_angle(landmarks[1], landmarks[0], landmarks[2])  
-
-                if 35 <= int(angR) <= 56 and 35 <= int(angL) <= 57:
-                    return True, "Frontal Face"
-                elif angR < angL:
-                    return True, "Right Profile"
-                else:
-                    return True, "Left Profile"
-            else:
-                return False, f"Invalid pose detected: Low detection probability ({prob:.2f})"
-        
-        return False, "No valid face pose detected"
+        bbox, probs, landmarks_list = get_mtcnn().detect(im, landmarks=True)
+
+        landmarks, face_probs = select_faces([bbox], [probs], [landmarks_list])
+        is_valid, pose, _ = classify_poses(landmarks, face_probs)[0]
+        return is_valid, pose
     except Exception as e:
-        return False, f"Error processing image: {str(e)}"
\ No newline at end of file
+        return False, f"Error processing image: {str(e)}"
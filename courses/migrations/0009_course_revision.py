@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+def mark_existing_courses(apps, schema_editor):
+    # Existing face models have trained_revision 0, so they retrain once
+    Course = apps.get_model("courses", "Course")
+    Course.objects.update(revision=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_enrollment_unique_enrollment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="revision",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(mark_existing_courses, migrations.RunPython.noop),
+    ]
@@ -8,10 +8,16 @@ class Course(models.Model):
     details = models.TextField(max_length=500)
     create_at = models.DateField(auto_now_add=True)
     image = models.ImageField(upload_to='course_images/',null=True, blank=True, default="course_images/default.jpg")
+    # Bumped whenever enrollments or a student's training images change
+    revision = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.course_name
 
+    @classmethod
+    def bump_revision(cls, **filters):
+        cls.objects.filter(**filters).update(revision=models.F('revision') + 1)
+
 class Enrollment(models.Model):
     student = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="enrollments", null=True, blank=True, default=None)
     email = models.EmailField(null=True, blank=True)  
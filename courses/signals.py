@@ -1,7 +1,7 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from .models import Enrollment
+from .models import Course, Enrollment
 from members.models import Member
 
 @receiver(post_save, sender=Member)
@@ -12,4 +12,11 @@ def link_enrollments_to_member(sender, instance, created, **kwargs):
         enrollments = Enrollment.objects.filter(email=email)
         for enrollment in enrollments:
             enrollment.student = instance 
-            enrollment.save()
\ No newline at end of file
+            enrollment.save()
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def bump_course_revision_on_enrollment(sender, instance, **kwargs):
+    # Email-only enrollments have no images to train on until the student registers
+    if instance.student_id:
+        Course.bump_revision(pk=instance.course_id)
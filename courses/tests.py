@@ -1,3 +1,44 @@
 from django.test import TestCase
 
-# Create your tests here.
+from members.models import Member
+from .models import Course, Enrollment
+
+class CourseRevisionTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(course_code="CS101", course_name="Math")
+        self.student = Member.objects.create(username="student1", email="student1@example.com")
+
+    def revision(self):
+        self.course.refresh_from_db()
+        return self.course.revision
+
+    def test_enrollment_save_bumps_revision(self):
+        Enrollment.objects.create(student=self.student, email=self.student.email, course=self.course)
+
+        self.assertEqual(self.revision(), 1)
+
+    def test_enrollment_delete_bumps_revision(self):
+        enrollment = Enrollment.objects.create(student=self.student, email=self.student.email, course=self.course)
+        enrollment.delete()
+
+        self.assertEqual(self.revision(), 2)
+
+    def test_email_only_enrollment_does_not_bump_revision(self):
+        enrollment = Enrollment.objects.create(email="pending@example.com", course=self.course)
+        enrollment.delete()
+
+        self.assertEqual(self.revision(), 0)
+
+    def test_registering_member_links_and_bumps_email_enrollment(self):
+        Enrollment.objects.create(email="pending@example.com", course=self.course)
+        Member.objects.create(username="pending", email="pending@example.com")
+
+        self.assertEqual(self.revision(), 1)
+
+    def test_bump_only_touches_matching_courses(self):
+        other = Course.objects.create(course_code="CS102", course_name="Physics")
+        Enrollment.objects.create(student=self.student, email=self.student.email, course=self.course)
+
+        other.refresh_from_db()
+        self.assertEqual(self.revision(), 1)
+        self.assertEqual(other.revision, 0)
@@ -90,6 +90,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "dashboard.wsgi.application"
+ASGI_APPLICATION = "dashboard.asgi.application"
 
 
 # Database
@@ -198,4 +199,16 @@ SOCIALACCOUNT_LOGIN_ON_GET=True
 LOGIN_URL = 'login'
 
 TEMP_DIR = os.path.join(MEDIA_ROOT, 'temp')
-os.makedirs(TEMP_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+# Face-pose validation (common/pose.py)
+POSE_WORKERS = int(os.getenv('POSE_WORKERS', 1))
+POSE_MAX_SIDE = int(os.getenv('POSE_MAX_SIDE', 640))
+POSE_BATCH_SIZE = int(os.getenv('POSE_BATCH_SIZE', 16))
+
+# Bulk training-image ingestion (devices/ingest.py)
+TRAINING_SERVICE_URL = os.getenv('TRAINING_SERVICE_URL', 'http://training_service:8001')
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 500))
+INGEST_MAX_IMAGE_BYTES = int(os.getenv('INGEST_MAX_IMAGE_BYTES', 20 * 1024 * 1024))
+INGEST_MAX_ARCHIVE_ENTRIES = int(os.getenv('INGEST_MAX_ARCHIVE_ENTRIES', 5000))
+INGEST_MAX_ARCHIVE_BYTES = int(os.getenv('INGEST_MAX_ARCHIVE_BYTES', 2 * 1024 ** 3))
@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+import zipfile
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from courses.models import Course
+from .models import TrainingImage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CHUNK_SIZE = 1024 * 1024
+
+def _limit(name, default):
+    return getattr(settings, name, default)
+
+def iter_sources(files):
+    # Yields (name, stream) for every image upload, expanding zip archives in place.
+    # Images over INGEST_MAX_IMAGE_BYTES come with stream None so they are reported, not read.
+    max_image_bytes = _limit('INGEST_MAX_IMAGE_BYTES', 20 * 1024 * 1024)
+    for upload in files:
+        if upload.name.lower().endswith('.zip'):
+            with zipfile.ZipFile(upload) as archive:
+                entries = [info for info in archive.infolist() if not info.is_dir()]
+                # Sizes come from the central directory, so a zip bomb is refused before
+                # anything is decompressed; zipfile never inflates past file_size
+                if len(entries) > _limit('INGEST_MAX_ARCHIVE_ENTRIES', 5000):
+                    raise ValueError(f"{upload.name}: too many files in archive ({len(entries)})")
+                if sum(info.file_size for info in entries) > _limit('INGEST_MAX_ARCHIVE_BYTES', 2 * 1024 ** 3):
+                    raise ValueError(f"{upload.name}: archive is too large when extracted")
+                for info in entries:
+                    if info.file_size > max_image_bytes:
+                        yield info.filename, None
+                        continue
+                    with archive.open(info) as stream:
+                        yield info.filename, stream
+        elif upload.size is not None and upload.size > max_image_bytes:
+            yield upload.name, None
+        else:
+            yield upload.name, upload
+
+def _store(stream, folder):
+    # Streams to a temporary file while hashing, so each image is read exactly once
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(folder, f".{uuid.uuid4().hex}.part")
+    try:
+        with open(tmp_path, 'wb') as destination:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                destination.write(chunk)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), tmp_path
+
+def ingest_training_images(member, sources, batch_size=None, queue_preprocess=True):
+    batch_size = batch_size or getattr(settings, 'INGEST_BATCH_SIZE', 500)
+    summary = {'created': 0, 'duplicates': 0, 'skipped': 0, 'errors': []}
+
+    relative_folder = f"training_images/member_{member.id}"
+    folder = os.path.join(settings.MEDIA_ROOT, relative_folder)
+    os.makedirs(folder, exist_ok=True)
+
+    known_hashes = set(
+        TrainingImage.objects.filter(member=member)
+        .exclude(content_hash='')
+        .values_list('content_hash', flat=True)
+    )
+    pending = []
+    created = []
+
+    def stored_hashes(images):
+        return set(
+            TrainingImage.objects.filter(member=member, content_hash__in=[image.content_hash for image in images])
+            .values_list('content_hash', flat=True)
+        )
+
+    def discard(images):
+        # Remove the files that no row points to, e.g. after a failed insert
+        taken = stored_hashes(images)
+        for image in images:
+            if image.content_hash not in taken:
+                try:
+                    os.remove(os.path.join(settings.MEDIA_ROOT, image.file_path.name))
+                except OSError:
+                    pass
+
+    def flush():
+        # bulk_create skips post_save, so course revisions are bumped once below
+        batch = list(pending)
+        pending.clear()
+        try:
+            try:
+                with transaction.atomic():
+                    TrainingImage.objects.bulk_create(batch)
+            except IntegrityError:
+                # A concurrent ingest stored some of these images first; those rows
+                # (and the identical content-addressed files) are theirs
+                taken = stored_hashes(batch)
+                batch = [image for image in batch if image.content_hash not in taken]
+                summary['duplicates'] += len(taken)
+                with transaction.atomic():
+                    TrainingImage.objects.bulk_create(batch)
+        except Exception:
+            discard(batch)
+            raise
+        created.extend(batch)
+
+    try:
+        for name, stream in sources:
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in IMAGE_EXTENSIONS:
+                summary['skipped'] += 1
+                continue
+            if stream is None:
+                summary['skipped'] += 1
+                summary['errors'].append(f"{name}: image is too large")
+                continue
+
+            try:
+                content_hash, tmp_path = _store(stream, folder)
+            except Exception as e:
+                summary['errors'].append(f"{name}: {str(e)}")
+                continue
+
+            if content_hash in known_hashes:
+                os.remove(tmp_path)
+                summary['duplicates'] += 1
+                continue
+            known_hashes.add(content_hash)
+
+            # Content-addressed file names keep duplicates off the disk as well
+            file_name = f"{content_hash[:32]}{ext}"
+            os.replace(tmp_path, os.path.join(folder, file_name))
+            pending.append(TrainingImage(
+                member=member,
+                file_path=f"{relative_folder}/{file_name}",
+                content_hash=content_hash
+            ))
+            if len(pending) >= batch_size:
+                flush()
+
+        if pending:
+            flush()
+    finally:
+        if pending:
+            # The source failed before these files reached the database
+            discard(pending)
+        # Batches that made it in are announced even if a later one failed
+        summary['created'] = len(created)
+        if created:
+            Course.bump_revision(enrollments__student_id=member.id)
+            if queue_preprocess:
+                images = [{'member': member.id, 'file_path': image.file_path.url} for image in created]
+                transaction.on_commit(lambda: queue_preprocessing(images))
+
+    return summary
+
+def queue_preprocessing(images):
+    # Fire and forget: the training service aligns the new images into its face
+    # cache ahead of the next training run. Failures only cost that head start.
+    def send():
+        try:
+            requests.post(
+                f"{getattr(settings, 'TRAINING_SERVICE_URL', 'http://training_service:8001')}/preprocess",
+                json={'images': images},
+                timeout=5
+            ).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not queue preprocessing for %d images: %s", len(images), e)
+
+    threading.Thread(target=send, daemon=True).start()
@@ -0,0 +1,95 @@
+import os
+import zipfile
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from devices.ingest import ingest_training_images
+from members.models import Member
+
+def _iter_directory(root):
+    for folder, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            path = os.path.join(folder, filename)
+            yield os.path.relpath(path, root), path
+
+def iter_entries(path):
+    # Yields (relative name, opener) for every file in a directory, zip archive or single file
+    if os.path.isdir(path):
+        for name, file_path in _iter_directory(path):
+            yield name, lambda file_path=file_path: open(file_path, 'rb')
+    elif zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        for info in sorted(archive.infolist(), key=lambda info: info.filename):
+            if not info.is_dir():
+                yield info.filename, lambda info=info: archive.open(info)
+    else:
+        yield os.path.basename(path), lambda: open(path, 'rb')
+
+def stream(entries):
+    for name, opener in entries:
+        with opener() as f:
+            yield name, f
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-ingest training images from folders, zip archives or files. "
+        "Without --member, the top-level folder of each image names the member "
+        "(username or student ID)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Image files, folders or zip archives")
+        parser.add_argument('--member', help="Username or student ID that receives every image")
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per bulk insert")
+        parser.add_argument('--no-preprocess', action='store_true', help="Do not queue preprocessing on the training service")
+
+    def get_member(self, key):
+        member = Member.objects.filter(Q(username=key) | Q(student_id=key)).first()
+        if member is None:
+            self.stderr.write(f"No member matches '{key}'")
+        return member
+
+    def ingest(self, member, entries, totals, options):
+        summary = ingest_training_images(
+            member, stream(entries),
+            batch_size=options['batch_size'],
+            queue_preprocess=not options['no_preprocess']
+        )
+        for key in ('created', 'duplicates', 'skipped'):
+            totals[key] += summary[key]
+        totals['errors'].extend(summary['errors'])
+        self.stdout.write(
+            f"{member.username}: {summary['created']} created, "
+            f"{summary['duplicates']} duplicates, {summary['skipped']} skipped"
+        )
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            if not os.path.exists(path):
+                raise CommandError(f"Path not found: {path}")
+
+        totals = {'created': 0, 'duplicates': 0, 'skipped': 0, 'errors': []}
+
+        if options['member']:
+            member = self.get_member(options['member'])
+            if member is None:
+                raise CommandError("Unknown member")
+            entries = (entry for path in options['paths'] for entry in iter_entries(path))
+            self.ingest(member, entries, totals, options)
+        else:
+            for path in options['paths']:
+                # Entries come sorted by name, so each member folder is one contiguous group
+                nested = (entry for entry in iter_entries(path) if '/' in entry[0].replace(os.sep, '/'))
+                for key, group in groupby(nested, key=lambda entry: entry[0].replace(os.sep, '/').split('/', 1)[0]):
+                    member = self.get_member(key)
+                    if member is not None:
+                        self.ingest(member, group, totals, options)
+
+        for error in totals['errors']:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {totals['created']} created, {totals['duplicates']} duplicates, "
+            f"{totals['skipped']} skipped, {len(totals['errors'])} errors"
+        ))
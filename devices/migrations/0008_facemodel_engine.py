@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("devices", "0007_facemodel_last_enrollment_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facemodel",
+            name="engine",
+            field=models.CharField(
+                choices=[("softmax", "Softmax"), ("embedding", "Embedding")],
+                default="softmax",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("devices", "0008_facemodel_engine"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facemodel",
+            name="tflite_path",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="facemodel",
+            name="onnx_path",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("devices", "0009_facemodel_tflite_path_facemodel_onnx_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="facemodel",
+            name="trained_revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("devices", "0010_facemodel_trained_revision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trainingimage",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name="trainingimage",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("content_hash", ""), _negated=True),
+                fields=("member", "content_hash"),
+                name="unique_member_training_image_hash",
+            ),
+        ),
+    ]
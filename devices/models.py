@@ -3,8 +3,7 @@ import os
 from members.models import Member
 from courses.models import Course
 from common.models import Room
-from common.enums import DevicesStatusEnum, AttendanceStatusEnum
-from django.conf import settings
+from common.enums import DevicesStatusEnum, AttendanceStatusEnum, FaceModelEngineEnum
 
 class Device(models.Model):
     device_name = models.CharField(max_length=255)
@@ -24,18 +23,24 @@ class Device(models.Model):
         return f"{self.device_name} ({self.room})"
 
 def training_image_upload_path(instance, filename):
+    # FileSystemStorage creates the member folder on save
     folder_path = f"training_images/member_{instance.member.id}/"
-    
-    full_path = os.path.join(settings.MEDIA_ROOT, folder_path)
-    if not os.path.exists(full_path):
-        os.makedirs(full_path)
-    
     return os.path.join(folder_path, filename)
 
 class TrainingImage(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name="training_images")
     file_path = models.ImageField(upload_to=training_image_upload_path)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['member', 'content_hash'],
+                condition=~models.Q(content_hash=""),
+                name="unique_member_training_image_hash",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.file_path}"
@@ -46,9 +51,15 @@ class FaceModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
     model_path = models.CharField(max_length=255)
+    tflite_path = models.CharField(max_length=255, blank=True, default="")
+    onnx_path = models.CharField(max_length=255, blank=True, default="")
     inverse_label_map = models.CharField(max_length=255)
     updated_at = models.DateTimeField(auto_now=True)
     last_enrollment_count = models.IntegerField(default=0)  
+    trained_revision = models.PositiveIntegerField(default=0)
+    engine = models.CharField(
+        max_length=10, choices=FaceModelEngineEnum.choices, default=FaceModelEngineEnum.SOFTMAX
+    )
 
     def __str__(self):
         return f"Model v{self.model_version}"
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import TrainingImage
+from courses.models import Course
+
+@receiver(post_save, sender=TrainingImage)
+@receiver(post_delete, sender=TrainingImage)
+def bump_course_revision_on_training_image(sender, instance, **kwargs):
+    Course.bump_revision(enrollments__student_id=instance.member_id)
@@ -1,3 +1,131 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import zipfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from members.models import Member
+from courses.models import Course, Enrollment
+from .models import TrainingImage
+from .ingest import ingest_training_images, iter_sources
+
+class TrainingImageRevisionTest(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(course_code="CS101", course_name="Math")
+        self.other_course = Course.objects.create(course_code="CS102", course_name="Physics")
+        self.student = Member.objects.create(username="student1", email="student1@example.com")
+        Enrollment.objects.create(student=self.student, email=self.student.email, course=self.course)
+        self.course.refresh_from_db()
+        self.start = self.course.revision
+
+    def revision(self, course):
+        course.refresh_from_db()
+        return course.revision
+
+    def test_training_image_save_bumps_enrolled_courses(self):
+        TrainingImage.objects.create(member=self.student, file_path="training_images/member_1/a.jpg")
+
+        self.assertEqual(self.revision(self.course), self.start + 1)
+        self.assertEqual(self.revision(self.other_course), 0)
+
+    def test_training_image_delete_bumps_enrolled_courses(self):
+        image = TrainingImage.objects.create(member=self.student, file_path="training_images/member_1/a.jpg")
+        image.delete()
+
+        self.assertEqual(self.revision(self.course), self.start + 2)
+
+
+class IngestTrainingImagesTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.course = Course.objects.create(course_code="CS101", course_name="Math")
+        self.student = Member.objects.create(username="student1", email="student1@example.com")
+        Enrollment.objects.create(student=self.student, email=self.student.email, course=self.course)
+
+    def ingest(self, files):
+        return ingest_training_images(self.student, iter_sources(files), queue_preprocess=False)
+
+    def revision(self):
+        self.course.refresh_from_db()
+        return self.course.revision
+
+    def test_duplicates_are_skipped(self):
+        summary = self.ingest([
+            SimpleUploadedFile("a.jpg", b"first"),
+            SimpleUploadedFile("b.jpg", b"second"),
+            SimpleUploadedFile("copy.jpg", b"first"),
+        ])
+
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(summary['duplicates'], 1)
+        self.assertEqual(TrainingImage.objects.filter(member=self.student).count(), 2)
+
+        summary = self.ingest([SimpleUploadedFile("again.jpg", b"second")])
+        self.assertEqual((summary['created'], summary['duplicates']), (0, 1))
+
+    def test_files_are_content_addressed(self):
+        self.ingest([SimpleUploadedFile("a.jpg", b"first")])
+
+        image = TrainingImage.objects.get(member=self.student)
+        self.assertEqual(len(image.content_hash), 64)
+        self.assertTrue(image.file_path.name.endswith(f"{image.content_hash[:32]}.jpg"))
+        with open(os.path.join(self.media_root, image.file_path.name), 'rb') as f:
+            self.assertEqual(f.read(), b"first")
+        folder = os.path.join(self.media_root, f"training_images/member_{self.student.id}")
+        self.assertFalse([name for name in os.listdir(folder) if name.endswith('.part')])
+
+    def test_zip_archives_are_expanded(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr("photos/a.jpg", b"first")
+            archive.writestr("photos/b.png", b"second")
+            archive.writestr("photos/notes.txt", b"not an image")
+
+        summary = self.ingest([SimpleUploadedFile("photos.zip", buffer.getvalue())])
+
+        self.assertEqual((summary['created'], summary['skipped']), (2, 1))
+        self.assertEqual(
+            sorted(os.path.splitext(image.file_path.name)[1] for image in TrainingImage.objects.all()),
+            ['.jpg', '.png']
+        )
+
+    def test_revision_bumped_once_per_ingest(self):
+        start = self.revision()
+
+        self.ingest([SimpleUploadedFile(f"{i}.jpg", f"image {i}".encode()) for i in range(3)])
+        self.assertEqual(self.revision(), start + 1)
+
+        # Nothing new, nothing to retrain
+        self.ingest([SimpleUploadedFile("0.jpg", b"image 0")])
+        self.assertEqual(self.revision(), start + 1)
+
+    @override_settings(INGEST_MAX_IMAGE_BYTES=8)
+    def test_oversized_images_are_skipped(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr("small.jpg", b"small")
+            archive.writestr("large.jpg", b"much too large")
+
+        summary = self.ingest([SimpleUploadedFile("photos.zip", buffer.getvalue())])
+
+        self.assertEqual((summary['created'], summary['skipped']), (1, 1))
+        self.assertIn("large.jpg", summary['errors'][0])
+
+    @override_settings(INGEST_MAX_ARCHIVE_ENTRIES=2)
+    def test_archives_with_too_many_entries_are_rejected(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for i in range(3):
+                archive.writestr(f"{i}.jpg", f"image {i}".encode())
+
+        with self.assertRaises(ValueError):
+            self.ingest([SimpleUploadedFile("photos.zip", buffer.getvalue())])
+        self.assertFalse(TrainingImage.objects.exists())
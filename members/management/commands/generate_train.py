@@ -2,6 +2,7 @@ import os
 from django.core.management.base import BaseCommand
 from members.models import Student
 from devices.models import TrainingImage 
+from courses.models import Course
 from django.conf import settings
 
 class Command(BaseCommand):
@@ -14,17 +15,22 @@ class Command(BaseCommand):
 
         image_base_path = "training_images"  
 
-        for student in students:
+        images = []
+        for student in students.select_related('member'):
             member = student.member 
             member_folder = os.path.join(image_base_path, f"member_{member.id}")
 
            
             fake_image_path = os.path.join(member_folder, f"test.jpg")
             
-            TrainingImage.objects.create(
+            images.append(TrainingImage(
                 member=member,
                 file_path=fake_image_path,  
-            )
+            ))
             self.stdout.write(f"Created training image for student {student.student_id}: {fake_image_path}")
 
+        # bulk_create skips post_save, so every affected course is bumped once here
+        TrainingImage.objects.bulk_create(images)
+        Course.bump_revision(enrollments__student_id__in=[image.member_id for image in images])
+
         self.stdout.write("Seeding complete.")
@@ -3,15 +3,14 @@ from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from django.conf import settings
-import os
 
 from .models import Member, Report
 from attendance.models import Attendance, Schedule
 from courses.models import Course, Enrollment
 from devices.models import TrainingImage, Device
 from common.models import Room
-from common.utils import predFacePose
+from common.pose import pose_engine
+from devices.ingest import ingest_training_images, iter_sources
 from django.utils.timezone import now
 from .forms import ReportForm
 
@@ -60,9 +59,8 @@ def get_member_detail(request, member_id):
     return JsonResponse(data)
 
 @require_http_methods(["POST"])
-def validate_face_poses(request):
+async def validate_face_poses(request):
     response = {'valid': True, 'errors': [], 'poses_detected': []}
-    temp_files = []
     pose_counts = {
         'Left Profile': 0,
         'Right Profile': 0,
@@ -77,31 +75,20 @@ def validate_face_poses(request):
                 'valid': False,
                 'errors': ['Please upload at least 3 images']
             })
-            
-        for upload in files:
-            temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            temp_path = os.path.join(temp_dir, f'temp_{upload.name}')
-            with open(temp_path, 'wb+') as destination:
-                for chunk in upload.chunks():
-                    destination.write(chunk)
-            temp_files.append(temp_path)
-            
-            try:
-                is_valid, detected_pose = predFacePose(temp_path)
-                
-                if is_valid:
-                    pose_counts[detected_pose] += 1
-                    response['poses_detected'].append({
-                        'filename': upload.name,
-                        'pose': detected_pose
-                    })
-                else:
-                    response['errors'].append(f"Failed to detect valid pose in {upload.name}: {detected_pose}")
-                    
-            except Exception as e:
-                response['errors'].append(f"Error processing {upload.name}: {str(e)}")
+
+        # All images of the request go through MTCNN as one batch on the pose pool
+        results = await pose_engine.validate_async(files)
+
+        for upload, (is_valid, detected_pose, confidence) in zip(files, results):
+            if is_valid:
+                pose_counts[detected_pose] += 1
+                response['poses_detected'].append({
+                    'filename': upload.name,
+                    'pose': detected_pose,
+                    'confidence': round(confidence, 4)
+                })
+            else:
+                response['errors'].append(f"Failed to detect valid pose in {upload.name}: {detected_pose}")
         
         if pose_counts['Left Profile'] == 0:
             response['errors'].append("Missing Left Profile pose")
@@ -115,13 +102,6 @@ def validate_face_poses(request):
     except Exception as e:
         response['valid'] = False
         response['errors'].append(f"System error: {str(e)}")
-        
-    finally:
-        for temp_file in temp_files:
-            try:
-                os.remove(temp_file)
-            except Exception:
-                pass
                 
     return JsonResponse(response)
 
@@ -135,12 +115,11 @@ def save_training_images(request):
         member = Member.objects.get(username=user)
 
         files = request.FILES.getlist('images')
-        
-        for upload in files:
-            TrainingImage.objects.create(
-                member=member,
-                file_path=upload
-            )
+
+        # Streams each upload (or zip archive) once, skipping images already on file
+        summary = ingest_training_images(member, iter_sources(files))
+        response.update({key: summary[key] for key in ('created', 'duplicates', 'skipped')})
+        response['errors'].extend(summary['errors'])
     except Exception as e:
         response['success'] = False
         response['errors'].append(str(e))
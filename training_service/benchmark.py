@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+import numpy as np
+
+from utils.preprocess import FacePreprocessor
+from utils.data_loader import DataLoader
+from utils.member_store import MemberFeatureStore
+from utils.negatives import NegativeSet, IMAGE_EXTENSIONS
+from utils.api_communicator import APIClient
+
+# End-to-end benchmark of the training pipeline on synthetic courses.
+#
+#   python benchmark.py --students 10,20,40 --images-per-student 10 --output bench.json
+#
+# Each synthetic student is derived from one seed photo (random rotation, scale,
+# shift, flip and lighting), so face detection and alignment do real work. The
+# DataLoader talks to a local stub of the Django API, and every stage reports
+# wall time, images/sec and the process peak RSS.
+
+LANDMARK_PATH = "utils/shape_predictor_68_face_landmarks.dat"
+
+def _fake_jwt() -> str:
+    def encode(data: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+    return f"{encode({'alg': 'none'})}.{encode({'exp': time.time() + 24 * 3600})}.benchmark"
+
+class StubAPI:
+    # Serves just the endpoints DataLoader needs: token and training images per course
+    def __init__(self):
+        self.courses: Dict[int, List[Dict[str, Any]]] = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, payload: Any) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.startswith("/api/token/"):
+                    self._send(200, {"access": _fake_jwt(), "refresh": "benchmark"})
+                else:
+                    self._send(404, {"detail": "Not found."})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/api/TrainingImageViewSet/":
+                    course_id = int(parse_qs(url.query).get("course_id", ["0"])[0])
+                    self._send(200, stub.courses.get(course_id, []))
+                else:
+                    self._send(404, {"detail": "Not found."})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'StubAPI':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def _peak_rss_mb() -> Dict[str, float]:
+    # ru_maxrss is in kilobytes on Linux
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }
+
+@contextmanager
+def stage(results: Dict[str, Any], name: str, images: int = 0):
+    entry: Dict[str, Any] = {"images": images}
+    start = time.perf_counter()
+    yield entry
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    if entry["images"]:
+        entry["images_per_sec"] = round(entry["images"] / max(entry["seconds"], 1e-9), 2)
+    entry["peak_rss_mb"] = _peak_rss_mb()
+    results[name] = entry
+    print(f"[{name}] {entry['seconds']:.2f}s"
+          + (f", {entry['images_per_sec']:.1f} images/sec" if entry["images"] else ""))
+
+def load_seeds(seed_dir: str) -> List[np.ndarray]:
+    seeds = []
+    for filename in sorted(os.listdir(seed_dir)) if os.path.isdir(seed_dir) else []:
+        if filename.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(seed_dir, filename))
+            if image is not None:
+                seeds.append(image)
+    return seeds
+
+def augment(image: np.ndarray, rng: random.Random) -> np.ndarray:
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), rng.uniform(-10, 10), rng.uniform(0.9, 1.1))
+    matrix[:, 2] += (rng.uniform(-0.05, 0.05) * w, rng.uniform(-0.05, 0.05) * h)
+    image = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REFLECT)
+    if rng.random() < 0.5:
+        image = cv2.flip(image, 1)
+    return cv2.convertScaleAbs(image, alpha=rng.uniform(0.8, 1.2), beta=rng.uniform(-20, 20))
+
+def generate_course(
+    seeds: List[np.ndarray], image_dir: str, students: int, images_per_student: int, seed: int
+) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    images = []
+    for student in range(students):
+        member_id = student + 1
+        member_dir = os.path.join(image_dir, f"member_{member_id}")
+        os.makedirs(member_dir, exist_ok=True)
+        for index in range(images_per_student):
+            path = os.path.abspath(os.path.join(member_dir, f"img_{index}.jpg"))
+            cv2.imwrite(path, augment(seeds[student % len(seeds)], rng), [cv2.IMWRITE_JPEG_QUALITY, 90])
+            images.append({"id": len(images) + 1, "member": member_id, "file_path": path})
+    return images
+
+def benchmark_size(args, seeds: List[np.ndarray], stub: StubAPI, students: int) -> Dict[str, Any]:
+    workdir = os.path.join(args.workdir, f"students_{students}")
+    course_id = students
+    results: Dict[str, Any] = {}
+
+    with stage(results, "generate", students * args.images_per_student):
+        images = generate_course(
+            seeds, os.path.join(workdir, "images"), students, args.images_per_student, args.seed
+        )
+    stub.courses[course_id] = images
+    paths = [image["file_path"] for image in images]
+
+    preprocessor = FacePreprocessor(landmark_path=LANDMARK_PATH)
+    with stage(results, "preprocess", len(paths)) as entry:
+        _, ok = preprocessor.preprocess_batch(paths, max_workers=args.workers)
+        entry["faces"] = int(ok.sum())
+
+    negative_set = NegativeSet(
+        source_dir=args.unknown_dir,
+        output_dir=os.path.join(workdir, "negatives"),
+        output_size=preprocessor.output_size
+    )
+
+    def make_loader() -> DataLoader:
+        # A fresh store instance skips the in-memory LRU, so the warm run reads from disk
+        loader = DataLoader(
+            base_url=stub.base_url,
+            landmark_path=LANDMARK_PATH,
+            max_workers=args.workers,
+            cache_dir=os.path.join(workdir, "cache", "faces"),
+            member_store=MemberFeatureStore(store_dir=os.path.join(workdir, "cache", "members")),
+            executor=args.executor,
+            api_client=APIClient(stub.base_url),
+            negative_set=negative_set
+        )
+        loader.authenticate("benchmark", "benchmark")
+        return loader
+
+    for name in ("load_cold", "load_warm"):
+        with stage(results, name, len(paths)) as entry:
+            X, y, _ = make_loader().load_course_data(course_id, streaming=True)
+            entry["dataset_images"] = int(len(y))
+            entry["classes"] = int(len(set(y.tolist())))
+
+    if not args.skip_train and len(y):
+        from utils.model import FaceRecognitionModel
+
+        model = FaceRecognitionModel(num_classes=len(set(y.tolist())))
+        with stage(results, "train", len(y) * args.epochs) as entry:
+            _, history = model.train(
+                X, y,
+                batch_size=args.batch_size,
+                epochs=args.epochs,
+                model_path=os.path.join(workdir, "model.keras"),
+                pipeline=args.pipeline,
+                feature_dir=os.path.join(workdir, "cache", "features")
+            )
+            entry["epochs_run"] = len(history.history.get("loss", []))
+            rates = history.history.get("images_per_sec", [])
+            if rates:
+                entry["fit_images_per_sec"] = round(sum(rates) / len(rates), 2)
+
+    return {"students": students, "images": len(paths), "stages": results}
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the training service pipeline")
+    parser.add_argument("--students", default="5,10,20", help="Comma-separated course sizes")
+    parser.add_argument("--images-per-student", type=int, default=10)
+    parser.add_argument("--seed-dir", default="preprocess_image/unknowns", help="Raw face photos to derive students from")
+    parser.add_argument("--unknown-dir", default="preprocess_image/unknown", help="Aligned unknown faces")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--pipeline", choices=("generator", "tfdata", "features"), default="generator")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--skip-train", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="Defaults to a temporary directory")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data")
+    parser.add_argument("--output", default=None, help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    seeds = load_seeds(args.seed_dir)
+    if not seeds:
+        print(f"No seed images found in {args.seed_dir}", file=sys.stderr)
+        return 1
+
+    cleanup = args.workdir is None and not args.keep
+    args.workdir = args.workdir or tempfile.mkdtemp(prefix="training-benchmark-")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "params": {key: value for key, value in vars(args).items() if key not in ("output", "keep")},
+        "runs": []
+    }
+
+    try:
+        with StubAPI() as stub:
+            for students in (int(size) for size in args.students.split(",") if size.strip()):
+                print(f"=== {students} students x {args.images_per_student} images ===")
+                report["runs"].append(benchmark_size(args, seeds, stub, students))
+    finally:
+        if cleanup:
+            shutil.rmtree(args.workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"Results written to {args.output}")
+    else:
+        print(output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
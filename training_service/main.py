@@ -1,15 +1,24 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, BackgroundTasks, HTTPException, File, UploadFile, Request
+from fastapi.responses import JSONResponse, Response
 from datetime import datetime, time
 import pytz
 import os
 import json
 import asyncio
 import logging
-from typing import Tuple
-
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+from utils.api_communicator import get_api_client, get_async_api_client, close_api_clients
+from utils.trainer import ModelTrainer
+from utils.scheduler import TrainingScheduler, TrainingJob
+from utils.config import TrainingConfig, ENGINES
+from utils.inference import ModelCache
+from utils.batching import MicroBatcher
+from utils.preprocess import FacePreprocessor
 from utils.data_loader import DataLoader
-from utils.model import FaceRecognitionModel
+from utils.file_response import file_response
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -24,109 +33,63 @@ app = FastAPI()
 # ตั้งค่าโซนเวลาไทย
 tz_bangkok = pytz.timezone('Asia/Bangkok')
 
-class ModelTrainer:
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
-        
-    async def train_course_model(self, course_id: int) -> None:
-        try:
-            loader = DataLoader(base_url="http://app:8000")
-            loader.authenticate("a", "a")
-
-            # ดึงข้อมูล Enrollment ของ course_id
-            enrollments = loader.api_client.make_request(
-                loader.api_client.endpoints.enrollment,
-                params={'course_id': course_id}
-            )
-
-            if not enrollments or "results" not in enrollments:
-                self.logger.warning(f"Skipping training for course {course_id} - Unable to fetch enrollment data")
-                return
-
-            enrollment_count = len(enrollments.get('results', []))
-
-            # ดึง FaceModel ของ course_id
-            existing_models = loader.api_client.make_request(
-                loader.api_client.endpoints.face_model,
-                params={'course_id': course_id}
-            )
-
-            if existing_models and existing_models.get('results', []):
-                face_model = existing_models['results'][0]
-                last_enrollment_count = face_model.get("last_enrollment_count", 0)
+API_BASE_URL = "http://app:8000"
 
-                if enrollment_count == last_enrollment_count:
-                    self.logger.info(f"Skipping training for course {course_id} - No new enrollments ({enrollment_count})")
-                    return
-
-            # โหลดข้อมูลการฝึก
-            X, y, inverse_label_map = loader.load_course_data(course_id=course_id)
-            if X.size == 0 or y.size == 0:
-                self.logger.info(f"Skipping training for course {course_id} - No training data found")
-                return
-
-            model = FaceRecognitionModel(num_classes=len(set(y)))
-
-            model_path = f"models/course_{course_id}.keras"
-            label_map = f"models/label_map_{course_id}.json"
-
-            os.makedirs(os.path.dirname(model_path), exist_ok=True)
-
-            trained_model, history = model.train(X, y, model_path=model_path)
-
-            # อัปเดตค่า Enrollment ล่าสุดที่ใช้เทรน
-            model_data = {
-                "course": course_id,
-                "description": "",
-                "model_path": model_path,
-                "inverse_label_map": label_map,
-                "last_enrollment_count": enrollment_count
-            }
-
-            if existing_models and existing_models.get('results', []):
-                model_data['model_version'] = face_model.get('model_version', 0) + 1
-                response = loader.api_client.make_request(
-                    f"{loader.api_client.endpoints.face_model}{face_model['id']}/",
-                    method='patch',
-                    json=model_data
-                )
-            else:
-                model_data['model_version'] = 1
-                response = loader.api_client.make_request(
-                    loader.api_client.endpoints.face_model,
-                    method='post',
-                    json=model_data
-                )
+@app.on_event("shutdown")
+async def close_clients():
+    scheduler = getattr(app.state, "scheduler", None)
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    await close_api_clients()
 
-            with open(label_map, 'w') as f:
-                json.dump(inverse_label_map, f)
-
-            self.logger.info(f"Successfully trained model for course {course_id} - {enrollment_count} enrollments")
+trainer = ModelTrainer()
+model_cache = ModelCache(embedding_model=trainer.embedding_model)
+micro_batcher = MicroBatcher(embedding_model=trainer.embedding_model)
+face_preprocessor = FacePreprocessor(landmark_path="utils/shape_predictor_68_face_landmarks.dat")
 
-        except Exception as e:
-            self.logger.error(f"Error training model for course {course_id}: {str(e)}")
-            raise
+training_scheduler = TrainingScheduler()
 
-trainer = ModelTrainer()
+def train_in_scheduler(course_id: int, engine: str) -> None:
+    # Manual trainings run in a scheduler worker process like the nightly ones, so
+    # TensorFlow and dlib never hold up the event loop serving /recognize
+    try:
+        training_scheduler.run(
+            [TrainingJob(course_id=course_id, engine=engine)], trainer.config, model_cache.invalidate
+        )
+    except RuntimeError as e:
+        logger.warning(f"Training for course {course_id} not started: {e}")
 
 async def train_all_courses():
-    loader = DataLoader(base_url="http://app:8000")
-    loader.authenticate("a", "a")
-
-    courses = loader.api_client.make_request(loader.api_client.endpoints.course)
+    api_client = get_api_client(API_BASE_URL)
+    api_client.authenticate("a", "a")
 
-    if not courses or "results" not in courses:
-        print("No courses found. Skipping training.")
+    config = TrainingConfig.from_entries(
+        api_client.make_request(api_client.endpoints.config)
+    )
+    trainer.config = config
+
+    # One query for every course's revision; only courses whose revision moved
+    # past their model's trained_revision (or whose engine changed) are queued.
+    jobs = []
+    for course in api_client.make_request(api_client.endpoints.course_revisions) or []:
+        # Courses without students or without any uploaded faces never get a model,
+        # so their revision would otherwise look stale every night
+        if not course['enrollment_count'] or not course.get('image_count'):
+            continue
+        stale = course['trained_revision'] is None or course['trained_revision'] < course['revision']
+        if stale or (course['engine'] or 'softmax') != config.engine:
+            jobs.append(TrainingJob(course_id=course['id'], engine=config.engine, size=course['enrollment_count']))
+
+    if not jobs:
+        print("No course revisions changed. Skipping training.")
         return
 
-    for course in courses["results"]:
-        course_id = course["id"]
-        print(f"Training started for course {course_id}")
-        await trainer.train_course_model(course_id)
+    print(f"Training queued for {len(jobs)} changed courses")
+    # Runs after a manual training that is still in progress instead of failing the night
+    await asyncio.to_thread(training_scheduler.run, jobs, config, model_cache.invalidate, True)
 
 def setup_scheduler():
-    loader = DataLoader(base_url="http://app:8000")
-    loader.authenticate("a", "a")
+    api_client = get_api_client(API_BASE_URL)
     scheduler = BackgroundScheduler(timezone=tz_bangkok)
 
     last_hour = None
@@ -135,16 +98,23 @@ def setup_scheduler():
     def update_scheduler():
         nonlocal last_hour, last_minute 
         try:
-            config = loader.api_client.make_request(loader.api_client.endpoints.config)
+            if not api_client.authenticate("a", "a"):
+                print("Django API is not reachable yet. Retrying next cycle.")
+                return
+
+            config = api_client.make_request(api_client.endpoints.config)
 
             if not config:
                 print("No config data found. Skipping this cycle.")
                 return
 
-            config_dict = {item['key']: item['value'] for item in config if 'key' in item and 'value' in item}
+            training_config = TrainingConfig.from_entries(config)
+            trainer.config = training_config
+            micro_batcher.max_batch_size = training_config.recognition_batch_size
+            micro_batcher.max_latency = training_config.recognition_max_latency_ms / 1000
 
-            hour = int(config_dict.get('hour', 18))
-            minute = int(config_dict.get('minute', 0))
+            hour = training_config.hour
+            minute = training_config.minute
 
             if hour != last_hour or minute != last_minute:
                 print(f"Updating Scheduler to {hour}:{minute}")
@@ -166,126 +136,241 @@ def setup_scheduler():
         except Exception as e:
             print(f"Error in update_scheduler: {e}")
 
-    scheduler.add_job(update_scheduler, IntervalTrigger(minutes=1))
+    # First check runs right away on the scheduler thread, so startup never waits on the API
+    scheduler.add_job(update_scheduler, IntervalTrigger(minutes=1), next_run_time=datetime.now(tz_bangkok))
 
     scheduler.start()
     print("Scheduler started and will check for config updates every 1 minute.")
+    return scheduler
 
-setup_scheduler()
+@app.on_event("startup")
+async def start_scheduler():
+    app.state.scheduler = setup_scheduler()
 
 @app.post("/train/{course_id}")
-async def trigger_training(course_id: int, background_tasks: BackgroundTasks):
-    loader = DataLoader(base_url="http://app:8000")
-    loader.authenticate("a", "a")
-
-    enrollments = loader.api_client.make_request(
-        loader.api_client.endpoints.enrollment,
-        params={'course_id': course_id}
-    )
-
-    if not enrollments or "results" not in enrollments:
+async def trigger_training(course_id: int, background_tasks: BackgroundTasks, engine: Optional[str] = None):
+    # Without an explicit engine the course keeps the configured one
+    engine = engine or trainer.config.engine
+    if engine not in ENGINES:
         return JSONResponse(
             status_code=400,
-            content={"message": f"Skipping training for course {course_id} - Unable to fetch enrollment data"}
+            content={"message": f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}"}
         )
 
-    enrollment_count = len(enrollments.get('results', []))
+    api_client = get_async_api_client(API_BASE_URL)
+    await api_client.authenticate("a", "a")
 
-    existing_models = loader.api_client.make_request(
-        loader.api_client.endpoints.face_model,
+    revisions = await api_client.make_request(
+        api_client.endpoints.course_revisions,
         params={'course_id': course_id}
     )
 
-    if existing_models and existing_models.get('results', []):
-        face_model = existing_models['results'][0]
-        last_enrollment_count = face_model.get("last_enrollment_count", 0)
-
-        if enrollment_count == last_enrollment_count:
-            return JSONResponse(
-                status_code=400,
-                content={"message": f"Skipping training for course {course_id} - No new enrollments ({enrollment_count})"}
-            )
+    if not revisions:
+        return JSONResponse(
+            status_code=400,
+            content={"message": f"Skipping training for course {course_id} - Unable to fetch course revision"}
+        )
 
-    background_tasks.add_task(trainer.train_course_model, course_id)
-    return {"message": f"Training started for course {course_id}"}
+    course = revisions[0]
+    if (
+        course['trained_revision'] is not None
+        and course['trained_revision'] >= course['revision']
+        and (course['engine'] or 'softmax') == engine
+    ):
+        return JSONResponse(
+            status_code=400,
+            content={"message": f"Skipping training for course {course_id} - Already trained at revision {course['revision']}"}
+        )
 
-@app.get("/download/{course_id}")
-async def download_model(course_id: int):
-    try:
-        loader = DataLoader(base_url="http://app:8000")
-        loader.authenticate("a", "a")
+    if training_scheduler.status()["running"]:
+        return JSONResponse(
+            status_code=409,
+            content={"message": f"Skipping training for course {course_id} - A training run is already in progress"}
+        )
 
-        response = loader.api_client.make_request(
-            loader.api_client.endpoints.face_model,
+    # A plain function, so Starlette runs it on its threadpool rather than the loop
+    background_tasks.add_task(train_in_scheduler, course_id, engine)
+    return {"message": f"Training started for course {course_id} ({engine})"}
+
+async def resolve_face_model(course_id: int) -> Optional[Dict[str, Any]]:
+    face_model = model_cache.cached_face_model(course_id)
+    if face_model is None:
+        api_client = get_async_api_client(API_BASE_URL)
+        await api_client.authenticate("a", "a")
+        response = await api_client.make_request(
+            api_client.endpoints.face_model,
             params={'course_id': course_id}
         )
+        if not response or not response.get("results"):
+            return None
+        face_model = response["results"][0]
+        model_cache.remember_face_model(course_id, face_model)
+    return face_model
+
+def decode_faces(payloads: List[bytes], aligned: bool) -> Tuple[np.ndarray, List[Optional[str]]]:
+    size = face_preprocessor.output_size
+    faces = np.zeros((len(payloads), size, size, 3), dtype=np.uint8)
+    errors: List[Optional[str]] = [None] * len(payloads)
+
+    for i, payload in enumerate(payloads):
+        image = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            errors[i] = "Cannot decode image"
+        elif aligned:
+            faces[i] = cv2.resize(image, (size, size))
+        else:
+            face = face_preprocessor.align_face(image)
+            if face is None:
+                errors[i] = "No face detected"
+            else:
+                faces[i] = face
 
-        if not response or "results" not in response or not response["results"]:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"No model found for course_id {course_id}."
-            )
+    return faces, errors
 
-        model_data = response["results"][0]
-        model_path = model_data.get("model_path")
+@app.post("/recognize/{course_id}")
+async def recognize(course_id: int, files: List[UploadFile] = File(...), aligned: bool = False):
+    face_model = await resolve_face_model(course_id)
+    if face_model is None:
+        raise HTTPException(status_code=404, detail=f"No model found for course_id {course_id}.")
 
-        if not model_path:
-            raise HTTPException(status_code=404, detail="Model path not provided.")
+    try:
+        loaded = await asyncio.to_thread(model_cache.get, face_model)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    payloads = [await upload.read() for upload in files]
+    faces, errors = await asyncio.to_thread(decode_faces, payloads, aligned)
+
+    valid = [i for i, error in enumerate(errors) if error is None]
+    predictions = await micro_batcher.submit(loaded, faces[valid])
+    by_index = dict(zip(valid, predictions))
+
+    results = []
+    for i, upload in enumerate(files):
+        result = {"filename": upload.filename, "member_id": None, "confidence": 0.0}
+        if errors[i]:
+            result["error"] = errors[i]
+        else:
+            result["member_id"], result["confidence"] = by_index[i]
+        results.append(result)
+
+    return {
+        "course_id": course_id,
+        "model_version": loaded.version,
+        "engine": loaded.engine,
+        "results": results
+    }
+
+@app.get("/training/status")
+async def training_status():
+    return training_scheduler.status()
+
+MEDIA_ROOT = os.path.realpath(os.getenv("MEDIA_ROOT", "/media"))
+_preprocess_loader: Optional[DataLoader] = None
+
+def get_preprocess_loader() -> DataLoader:
+    # One loader (and one FaceCache) for every /preprocess call
+    global _preprocess_loader
+    if _preprocess_loader is None:
+        _preprocess_loader = DataLoader(max_workers=trainer.config.preprocess_workers)
+    _preprocess_loader.max_workers = trainer.config.preprocess_workers
+    return _preprocess_loader
+
+def in_media_root(file_path: str) -> bool:
+    path = os.path.realpath(os.path.join('.', file_path))
+    return path.startswith(MEDIA_ROOT + os.sep)
+
+def warm_face_cache(images: List[Dict[str, Any]]) -> None:
+    # Aligns freshly ingested images into the face cache, so the next training
+    # run of every course they belong to starts from cache hits
+    aligned = get_preprocess_loader().preprocess(images)
+    logger.info(f"Preprocessed {len(images)} ingested images, {aligned} faces aligned")
+
+@app.post("/preprocess")
+async def preprocess_images(request: Request, background_tasks: BackgroundTasks):
+    payload = await request.json()
+    images = [
+        image for image in payload.get('images', [])
+        if image.get('member') and isinstance(image.get('file_path'), str) and in_media_root(image['file_path'])
+    ]
+    if images:
+        background_tasks.add_task(warm_face_cache, images)
+    return {"message": f"Queued {len(images)} images for preprocessing"}
+
+DOWNLOAD_FORMATS = {"keras": "model_path", "tflite": "tflite_path", "onnx": "onnx_path"}
+
+async def device_model_version(device_id: int) -> int:
+    api_client = get_async_api_client(API_BASE_URL)
+    await api_client.authenticate("a", "a")
+    device = await api_client.make_request(f"{api_client.endpoints.device}{device_id}/")
+    if not device:
+        raise HTTPException(status_code=404, detail=f"Device {device_id} not found.")
+    version = str(device.get("model_version") or "")
+    return int(version) if version.isdigit() else 0
+
+async def download_delta(request: Request, course_id: int, since_version: int) -> Response:
+    try:
+        path, manifest = await asyncio.to_thread(
+            trainer.artifact_store.delta_path, course_id, since_version
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # Every delta towards the same version shares the manifest digest
+    headers = {"X-Model-Version": str(manifest["version"]), "X-Base-Version": str(since_version)}
+    etag = f'"{manifest["digest"]}-{since_version}"'
+    if since_version == manifest["version"] or manifest["digest"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    return await file_response(
+        request,
+        path,
+        filename=f"course_{course_id}_v{since_version}_to_v{manifest['version']}.npz",
+        headers=headers,
+        etag=etag
+    )
 
-        if not os.path.exists(model_path):
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Model file '{model_path}' does not exist."
-            )
+async def resolve_artifact_path(course_id: int, field: str) -> str:
+    face_model = await resolve_face_model(course_id)
+    if face_model is None:
+        raise HTTPException(status_code=404, detail=f"No model found for course_id {course_id}.")
 
-        return FileResponse(
-            path=model_path,
-            filename=os.path.basename(model_path),
-            media_type="application/octet-stream"
-        )
+    path = face_model.get(field)
+    if path and not os.path.exists(path):
+        # The cached FaceModel may point at a replaced artifact; resolve again once
+        model_cache.invalidate(course_id)
+        face_model = await resolve_face_model(course_id) or {}
+        path = face_model.get(field)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"detail": f"Internal server error: {str(e)}"}
-        )
+    if not path:
+        raise HTTPException(status_code=404, detail=f"No {field} available for course_id {course_id}.")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"File '{path}' does not exist.")
+    return path
 
 @app.get("/download/{course_id}")
-async def download_model(course_id: int):
-    try:
-        loader = DataLoader(base_url="http://app:8000")
-        loader.authenticate("a", "a")
-
-        response = loader.api_client.make_request(
-            loader.api_client.endpoints.face_model,
-            params={'course_id': course_id}
+async def download_model(
+    request: Request,
+    course_id: int,
+    format: str = "keras",
+    since_version: Optional[int] = None,
+    device_id: Optional[int] = None
+):
+    if format not in DOWNLOAD_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{format}', expected one of {', '.join(DOWNLOAD_FORMATS)}"
         )
 
-        if not response or "results" not in response or not response["results"]:
-            raise HTTPException(
-                status_code=404, 
-                detail=f"No model found for course_id {course_id}."
-            )
-
-        model_data = response["results"][0]
-        model_path = model_data.get("model_path")
-
-        if not model_path:
-            raise HTTPException(status_code=404, detail="Model path not provided.")
-
-        if not os.path.exists(model_path):
-            raise HTTPException(
-                status_code=404, 
-                detail=f"Model file '{model_path}' does not exist."
-            )
+    try:
+        # Incremental mode: only tensor chunks that changed since the device's version
+        if since_version is not None or device_id is not None:
+            if since_version is None:
+                since_version = await device_model_version(device_id)
+            return await download_delta(request, course_id, max(0, since_version))
 
-        return FileResponse(
-            path=model_path,
-            filename=os.path.basename(model_path),
-            media_type="application/octet-stream"
-        )
+        model_path = await resolve_artifact_path(course_id, DOWNLOAD_FORMATS[format])
+        return await file_response(request, model_path, filename=os.path.basename(model_path))
 
     except HTTPException:
         raise
@@ -296,36 +381,16 @@ async def download_model(course_id: int):
         )
 
 @app.get("/download_label_map/{course_id}")
-async def download_label_map(course_id: int):
+async def download_label_map(request: Request, course_id: int):
     try:
-        loader = DataLoader(base_url="http://app:8000")
-        loader.authenticate("a", "a")
-
-        response = loader.api_client.make_request(
-            loader.api_client.endpoints.face_model,
-            params={'course_id': course_id}
+        inverse_label_map_path = await resolve_artifact_path(course_id, "inverse_label_map")
+        return await file_response(
+            request,
+            inverse_label_map_path,
+            filename=os.path.basename(inverse_label_map_path),
+            media_type="application/json"
         )
 
-        if not response or "results" not in response or not response["results"]:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No label map found for course_id {course_id}."
-            )
-
-        model_data = response["results"][0]
-        inverse_label_map_path = model_data.get("inverse_label_map")
-
-        if not inverse_label_map_path or not os.path.exists(inverse_label_map_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"Inverse label map file '{inverse_label_map_path}' does not exist."
-            )
-
-        with open(inverse_label_map_path, "r") as f:
-            inverse_label_map = json.load(f)
-
-        return JSONResponse(content=inverse_label_map)
-
     except HTTPException:
         raise
     except Exception as e:
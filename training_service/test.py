@@ -1,14 +1,32 @@
 import os
+import cv2
 from utils.preprocess import FacePreprocessor
+from utils.negatives import NegativeSet, IMAGE_EXTENSIONS
 
 input_folder = "preprocess_image/unknowns/"
 output_folder = "preprocess_image/unknown/"
 
 face = FacePreprocessor("utils/shape_predictor_68_face_landmarks.dat")
+os.makedirs(output_folder, exist_ok=True)
 
-for filename in os.listdir(input_folder):
+for filename in sorted(os.listdir(input_folder)):
     file_path = os.path.join(input_folder, filename)
-    
-    if os.path.isfile(file_path) and filename.lower().endswith((".jpg", ".jpeg", ".png")):
-        print(f"กำลังประมวลผลไฟล์: {filename}")
-        face.preprocess_image(image_path=file_path, output_folder=output_folder)
+    save_path = os.path.join(output_folder, filename)
+
+    if not os.path.isfile(file_path) or not filename.lower().endswith(IMAGE_EXTENSIONS):
+        continue
+    # Images aligned by an earlier run are kept as they are
+    if os.path.exists(save_path) and os.path.getmtime(save_path) >= os.path.getmtime(file_path):
+        continue
+
+    print(f"กำลังประมวลผลไฟล์: {filename}")
+    image = cv2.imread(file_path)
+    if image is None:
+        print(f"Cannot read image: {file_path}")
+        continue
+    aligned = face.align_face(image, file_path)
+    if aligned is not None:
+        cv2.imwrite(save_path, aligned)
+
+# Compile the aligned crops into the memory-mapped negative set used by training
+NegativeSet(source_dir=output_folder, output_size=face.output_size).build()
@@ -1,5 +1,13 @@
+import json
+import time
+import base64
+import asyncio
+import threading
+import httpx
 import requests
-from typing import Dict, Optional, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Iterator, Optional, Any, Tuple
 from dataclasses import dataclass
 
 @dataclass
@@ -11,6 +19,7 @@ class APIEndpoints:
     schedule: str
     device: str
     course: str
+    course_revisions: str
     config: str
 
     @classmethod
@@ -24,37 +33,115 @@ class APIEndpoints:
             schedule=f"{base}/api/Schedule/",
             device=f"{base}/api/device/",
             course=f"{base}/api/courses/",
+            course_revisions=f"{base}/api/courses/revisions/",
             config=f"{base}/api/service-configs/by-service/Training/"
         )
 
-class APIClient:
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip('/')
+class _TokenState:
+    # Shared JWT bookkeeping for the sync and async clients
+    refresh_leeway = 30
+
+    def _init_token_state(self) -> None:
         self.token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self._credentials: Optional[Tuple[str, str]] = None
+        self._token_expiry = 0.0
+
+    @staticmethod
+    def _decode_expiry(token: str) -> float:
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+        except (IndexError, KeyError, ValueError):
+            return 0.0
+
+    def _token_fresh(self) -> bool:
+        return bool(self.token) and self._token_expiry - self.refresh_leeway > time.time()
+
+    def _store_tokens(self, data: Dict[str, Any]) -> None:
+        self.token = data["access"]
+        self.refresh_token = data.get("refresh", self.refresh_token)
+        self._token_expiry = self._decode_expiry(self.token)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        if not self.token:
+            raise ValueError("Not authenticated. Call authenticate() first.")
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+
+class APIClient(_TokenState):
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 10
+    ):
+        self.base_url = base_url.rstrip('/')
         self.endpoints = APIEndpoints.from_base_url(self.base_url)
+        self.timeout = timeout
+        self._init_token_state()
+        self._lock = threading.Lock()
+
+        # Keep-alive connection pool; idempotent requests are retried with backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def authenticate(self, username: str, password: str) -> bool:
+        with self._lock:
+            if self._credentials == (username, password) and self._token_fresh():
+                return True
+            self._credentials = (username, password)
+            return self._obtain_token()
+
+    def _obtain_token(self) -> bool:
+        username, password = self._credentials
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/token/",
                 json={"username": username, "password": password},
-                timeout=10
+                timeout=self.timeout
             )
             response.raise_for_status()
-            self.token = response.json()["access"]
+            self._store_tokens(response.json())
             return True
         except requests.exceptions.RequestException as e:
             print(f"Authentication failed: {str(e)}")
             return False
 
-    @property
-    def headers(self) -> Dict[str, str]:
-        if not self.token:
-            raise ValueError("Not authenticated. Call authenticate() first.")
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
+    def refresh(self) -> bool:
+        with self._lock:
+            if self.refresh_token:
+                try:
+                    response = self.session.post(
+                        f"{self.base_url}/api/token/refresh/",
+                        json={"refresh": self.refresh_token},
+                        timeout=self.timeout
+                    )
+                    response.raise_for_status()
+                    self._store_tokens(response.json())
+                    return True
+                except requests.exceptions.RequestException as e:
+                    print(f"Token refresh failed: {str(e)}")
+
+            # Refresh token expired or missing: log in again with the cached credentials
+            return self._obtain_token() if self._credentials else False
 
     def make_request(
         self, 
@@ -62,18 +149,149 @@ class APIClient:
         method: str = 'get', 
         **kwargs
     ) -> Optional[Dict[str, Any]]:
+        if self.token and not self._token_fresh():
+            self.refresh()
+
+        response = None
         try:
-            response = requests.request(
-                method, 
-                url,
-                headers=self.headers,
-                timeout=10,
-                **kwargs
-            )
+            response = self.session.request(method, url, headers=self.headers, timeout=self.timeout, **kwargs)
+            if response.status_code == 401 and self.refresh():
+                response = self.session.request(method, url, headers=self.headers, timeout=self.timeout, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"API request failed: {str(e)}")
-            if hasattr(response, 'text'):
+            if response is not None:
                 print(f"Response text: {response.text}")
-            return None
\ No newline at end of file
+            return None
+
+    def iter_results(self, url: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        # Follows DRF page links; unpaginated list endpoints are yielded as-is
+        response = self.make_request(url, params=params)
+        while response:
+            if isinstance(response, list):
+                yield from response
+                return
+            yield from response.get('results', [])
+            next_url = response.get('next')
+            response = self.make_request(next_url) if next_url else None
+
+    def close(self) -> None:
+        self.session.close()
+
+class AsyncAPIClient(_TokenState):
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 10,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float = 10
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.endpoints = APIEndpoints.from_base_url(self.base_url)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._init_token_state()
+        self._lock = asyncio.Lock()
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=retries)
+        )
+
+    async def authenticate(self, username: str, password: str) -> bool:
+        async with self._lock:
+            if self._credentials == (username, password) and self._token_fresh():
+                return True
+            self._credentials = (username, password)
+            return await self._obtain_token()
+
+    async def _obtain_token(self) -> bool:
+        username, password = self._credentials
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/api/token/",
+                json={"username": username, "password": password}
+            )
+            response.raise_for_status()
+            self._store_tokens(response.json())
+            return True
+        except httpx.HTTPError as e:
+            print(f"Authentication failed: {str(e)}")
+            return False
+
+    async def refresh(self) -> bool:
+        async with self._lock:
+            if self.refresh_token:
+                try:
+                    response = await self.client.post(
+                        f"{self.base_url}/api/token/refresh/",
+                        json={"refresh": self.refresh_token}
+                    )
+                    response.raise_for_status()
+                    self._store_tokens(response.json())
+                    return True
+                except httpx.HTTPError as e:
+                    print(f"Token refresh failed: {str(e)}")
+
+            return await self._obtain_token() if self._credentials else False
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # The transport retries connection errors; 5xx on idempotent methods are retried here
+        attempts = self.retries + 1 if method.lower() in ('get', 'head', 'options') else 1
+        for attempt in range(attempts):
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            if response.status_code not in (502, 503, 504) or attempt == attempts - 1:
+                return response
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+        return response
+
+    async def make_request(
+        self,
+        url: str,
+        method: str = 'get',
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        if self.token and not self._token_fresh():
+            await self.refresh()
+
+        response = None
+        try:
+            response = await self._send(method, url, **kwargs)
+            if response.status_code == 401 and await self.refresh():
+                response = await self._send(method, url, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"API request failed: {str(e)}")
+            if response is not None:
+                print(f"Response text: {response.text}")
+            return None
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+_clients: Dict[str, APIClient] = {}
+_async_clients: Dict[str, AsyncAPIClient] = {}
+_clients_lock = threading.Lock()
+
+def get_api_client(base_url: str) -> APIClient:
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = APIClient(base_url)
+        return _clients[base_url]
+
+def get_async_api_client(base_url: str) -> AsyncAPIClient:
+    if base_url not in _async_clients:
+        _async_clients[base_url] = AsyncAPIClient(base_url)
+    return _async_clients[base_url]
+
+async def close_api_clients() -> None:
+    for client in list(_async_clients.values()):
+        await client.aclose()
+    _async_clients.clear()
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,212 @@
+import os
+import io
+import glob
+import json
+import hashlib
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+CHUNK_BYTES = 1 << 20
+MANIFEST_KEY = "__manifest__"
+
+# Versioned, chunked weight artifacts for incremental device updates.
+#
+# Every published version gets a small JSON manifest with one sha256 per tensor
+# chunk (tensors are split along their first axis into ~1 MB chunks), while only
+# the newest version's tensors are kept on disk. A delta from version N holds just
+# the chunks whose hashes differ from manifest N, plus the full target manifest,
+# so a device can rebuild and verify the new version from what it already has.
+
+def _hash(array: np.ndarray) -> str:
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _rows_per_chunk(array: np.ndarray) -> int:
+    row_bytes = max(1, array[:1].nbytes)
+    return max(1, CHUNK_BYTES // row_bytes)
+
+def _chunks(array: np.ndarray) -> List[np.ndarray]:
+    if array.ndim == 0 or len(array) == 0:
+        return [array]
+    rows = _rows_per_chunk(array)
+    return [array[start:start + rows] for start in range(0, len(array), rows)]
+
+def _manifest_digest(entries: Dict[str, Any], label_map: Dict[str, Any]) -> str:
+    payload = json.dumps({"tensors": entries, "label_map": label_map}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def build_manifest(
+    tensors: Dict[str, np.ndarray],
+    version: int,
+    engine: str,
+    label_map: Optional[Dict[Any, Any]] = None
+) -> Dict[str, Any]:
+    entries = {
+        name: {
+            "shape": list(array.shape),
+            "dtype": array.dtype.str,
+            "chunks": [_hash(chunk) for chunk in _chunks(array)]
+        }
+        for name, array in sorted(tensors.items())
+    }
+    # The label map travels with the weights it belongs to; JSON keys are strings anyway
+    label_map = {str(index): label for index, label in (label_map or {}).items()}
+    return {
+        "version": version,
+        "engine": engine,
+        "digest": _manifest_digest(entries, label_map),
+        "tensors": entries,
+        "label_map": label_map
+    }
+
+def model_tensors(model_path: str, engine: str) -> Dict[str, np.ndarray]:
+    if engine == "embedding":
+        with np.load(model_path) as data:
+            return {name: data[name] for name in data.files}
+
+    from tensorflow.keras.models import load_model
+    model = load_model(model_path)
+    return {weight.path: np.asarray(weight.numpy()) for weight in model.weights}
+
+def assign_tensors(model, tensors: Dict[str, np.ndarray]) -> None:
+    # Device-side counterpart of model_tensors for softmax models
+    for weight in model.weights:
+        weight.assign(tensors[weight.path])
+
+def delta_manifest(delta: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    # Target manifest of a delta, including the label map of the new version
+    manifest = json.loads(delta[MANIFEST_KEY].tobytes().decode())
+    if _manifest_digest(manifest["tensors"], manifest.get("label_map", {})) != manifest["digest"]:
+        raise ValueError("Artifact manifest is corrupted")
+    return manifest
+
+def apply_delta(base: Dict[str, np.ndarray], delta: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    manifest = delta_manifest(delta)
+
+    result = {}
+    for name, entry in manifest["tensors"].items():
+        base_chunks = _chunks(base[name]) if name in base else []
+        parts = []
+        for index, expected in enumerate(entry["chunks"]):
+            chunk = delta.get(f"{name}#{index}")
+            if chunk is None:
+                if index >= len(base_chunks):
+                    raise ValueError(f"Delta is missing chunk {index} of '{name}'")
+                chunk = base_chunks[index]
+            if _hash(chunk) != expected:
+                raise ValueError(f"Checksum mismatch in chunk {index} of '{name}'")
+            parts.append(chunk)
+
+        if len(parts) == 1:
+            array = parts[0]
+        else:
+            array = np.concatenate(parts)
+        if list(array.shape) != entry["shape"]:
+            raise ValueError(f"Shape mismatch for '{name}': {array.shape} != {tuple(entry['shape'])}")
+        result[name] = array
+    return result
+
+def read_artifact(data: bytes) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(data)) as archive:
+        return {name: archive[name] for name in archive.files}
+
+class ArtifactStore:
+    def __init__(self, root: str = "models/artifacts"):
+        self.root = root
+
+    def course_dir(self, course_id: int) -> str:
+        return os.path.join(self.root, f"course_{course_id}")
+
+    def manifest_path(self, course_id: int, version: int) -> str:
+        return os.path.join(self.course_dir(course_id), f"v{version}.json")
+
+    def tensors_path(self, course_id: int) -> str:
+        return os.path.join(self.course_dir(course_id), "current.npz")
+
+    def load_manifest(self, course_id: int, version: int) -> Optional[Dict[str, Any]]:
+        path = self.manifest_path(course_id, version)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def publish(
+        self,
+        course_id: int,
+        version: int,
+        engine: str,
+        model_path: str,
+        label_map: Optional[Dict[Any, Any]] = None
+    ) -> Dict[str, Any]:
+        tensors = model_tensors(model_path, engine)
+        manifest = build_manifest(tensors, version, engine, label_map)
+
+        # A version number is never reused for different weights; devices that
+        # applied it would otherwise get a 304 and keep the wrong model
+        existing = self.load_manifest(course_id, version)
+        if existing is not None and existing["digest"] != manifest["digest"]:
+            raise ValueError(f"Version {version} of course {course_id} is already published with other weights")
+        current = self._current_manifest(course_id)
+        if current is not None and current["version"] > version:
+            raise ValueError(f"Course {course_id} already has version {current['version']} published")
+
+        course_dir = self.course_dir(course_id)
+        os.makedirs(course_dir, exist_ok=True)
+        tmp_path = self.tensors_path(course_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **tensors)
+        os.replace(tmp_path, self.tensors_path(course_id))
+
+        tmp_manifest = self.manifest_path(course_id, version) + ".tmp"
+        with open(tmp_manifest, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path(course_id, version))
+
+        # Deltas were built against the previous current.npz
+        for stale in glob.glob(os.path.join(course_dir, "delta_*.npz")):
+            os.remove(stale)
+        return manifest
+
+    def delta_path(self, course_id: int, since_version: int) -> Tuple[str, Dict[str, Any]]:
+        # Returns (path to delta archive, target manifest); since_version 0 means a full artifact
+        current = self._current_manifest(course_id)
+        if current is None:
+            raise FileNotFoundError(f"No published artifact for course_id {course_id}.")
+
+        path = os.path.join(self.course_dir(course_id), f"delta_{since_version}_{current['version']}.npz")
+        if os.path.exists(path):
+            return path, current
+
+        base = self.load_manifest(course_id, since_version) if since_version else None
+        base_tensors = base["tensors"] if base else {}
+
+        with np.load(self.tensors_path(course_id)) as archive:
+            changed = {}
+            for name, entry in current["tensors"].items():
+                # Chunk hashes cover dtype and shape, so reshaped tensors are resent whole
+                old_chunks = base_tensors.get(name, {}).get("chunks", [])
+                chunks = None
+                for index, digest in enumerate(entry["chunks"]):
+                    if index < len(old_chunks) and old_chunks[index] == digest:
+                        continue
+                    if chunks is None:
+                        chunks = _chunks(archive[name])
+                    changed[f"{name}#{index}"] = chunks[index]
+
+        changed[MANIFEST_KEY] = np.frombuffer(json.dumps(current).encode(), dtype=np.uint8)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **changed)
+        os.replace(tmp_path, path)
+        return path, current
+
+    def _current_manifest(self, course_id: int) -> Optional[Dict[str, Any]]:
+        versions = [
+            int(os.path.basename(path)[1:-5])
+            for path in glob.glob(os.path.join(self.course_dir(course_id), "v*.json"))
+        ]
+        if not versions or not os.path.exists(self.tensors_path(course_id)):
+            return None
+        return self.load_manifest(course_id, max(versions))
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from .embedding import EmbeddingModel
+from .inference import LoadedModel, Prediction
+
+logger = logging.getLogger(__name__)
+
+# Coalesces recognition requests for the same course model into micro-batches.
+# The first request in a batch waits at most max_latency seconds for others to
+# join, then a single predict call runs for the whole batch and the results are
+# handed back to each waiting caller.
+class MicroBatcher:
+    def __init__(
+        self,
+        max_batch_size: int = 16,
+        max_latency: float = 0.02,
+        idle_timeout: float = 60.0,
+        embedding_model: Optional[EmbeddingModel] = None
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.idle_timeout = idle_timeout
+        self.embedding_model = embedding_model
+        self._queues: Dict[Tuple[int, int], asyncio.Queue] = {}
+        self._workers: Dict[Tuple[int, int], asyncio.Task] = {}
+
+    async def submit(self, loaded: LoadedModel, faces: np.ndarray) -> List[Prediction]:
+        if len(faces) == 0:
+            return []
+
+        key = (loaded.course_id, loaded.version)
+        if key not in self._workers or self._workers[key].done():
+            self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._worker(key, loaded, self._queues[key]))
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[key].put_nowait((faces, future))
+        return await future
+
+    async def _worker(self, key: Tuple[int, int], loaded: LoadedModel, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    # Idle (or superseded by a newer model version): stop and let GC take the model
+                    self._queues.pop(key, None)
+                    self._workers.pop(key, None)
+                    return
+                continue
+
+            items = [item]
+            count = len(item[0])
+            deadline = loop.time() + self.max_latency
+            while count < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                count += len(item[0])
+
+            await self._run_batch(loaded, items)
+
+    async def _run_batch(self, loaded: LoadedModel, items: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        batch = items[0][0] if len(items) == 1 else np.concatenate([faces for faces, _ in items])
+        try:
+            predictions = await asyncio.to_thread(loaded.predict, batch, self.embedding_model)
+        except Exception as e:
+            logger.error(f"Recognition failed for course {loaded.course_id}: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for faces, future in items:
+            if not future.done():
+                future.set_result(predictions[offset:offset + len(faces)])
+            offset += len(faces)
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+ENGINES = ("softmax", "embedding")
+
+def _convert(field_type, value: str):
+    if field_type is bool:
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+    return field_type(value)
+
+@dataclass
+class TrainingConfig:
+    hour: int = 18
+    minute: int = 0
+    engine: str = "softmax"
+    preprocess_workers: int = 1
+    preprocess_executor: str = "thread"
+    streaming_dataset: bool = True
+    dataset_memmap_dir: str = ""
+    input_pipeline: str = "generator"
+    cache_dataset: bool = False
+    feature_draws: int = 4
+    parallel_trainings: int = 1
+    threads_per_training: int = 0
+    inter_op_threads: int = 2
+    recognition_batch_size: int = 16
+    recognition_max_latency_ms: float = 20.0
+    export_formats: str = "tflite"
+    export_calibration_size: int = 200
+    warm_start: bool = True
+    warm_start_epochs: int = 4
+    warm_start_learning_rate: float = 1e-4
+    embedding_threshold: float = 0.0
+    embedding_false_accept_rate: float = 0.01
+    near_duplicate_threshold: int = 6
+    near_duplicate_cap: int = 0
+    member_image_cap: int = 0
+
+    @property
+    def export_format_list(self) -> List[str]:
+        return [fmt.strip() for fmt in self.export_formats.split(",") if fmt.strip()]
+
+    @classmethod
+    def from_entries(cls, entries: Optional[List[Dict[str, Any]]]) -> 'TrainingConfig':
+        values = {
+            item['key']: item['value']
+            for item in entries or []
+            if 'key' in item and 'value' in item
+        }
+
+        config = cls()
+        for field in fields(cls):
+            if field.name not in values:
+                continue
+            try:
+                setattr(config, field.name, _convert(field.type, values[field.name]))
+            except (TypeError, ValueError):
+                print(f"Ignoring invalid Training config {field.name}={values[field.name]!r}")
+
+        if config.engine not in ENGINES:
+            print(f"Unknown training engine {config.engine!r}, falling back to softmax")
+            config.engine = "softmax"
+        if config.preprocess_executor not in ("thread", "process"):
+            print(f"Unknown preprocess executor {config.preprocess_executor!r}, falling back to thread")
+            config.preprocess_executor = "thread"
+        if config.input_pipeline not in ("generator", "tfdata", "features"):
+            print(f"Unknown input pipeline {config.input_pipeline!r}, falling back to generator")
+            config.input_pipeline = "generator"
+        config.preprocess_workers = max(1, config.preprocess_workers)
+        config.feature_draws = max(1, config.feature_draws)
+        config.parallel_trainings = max(1, config.parallel_trainings)
+        config.inter_op_threads = max(1, config.inter_op_threads)
+        config.recognition_batch_size = max(1, config.recognition_batch_size)
+        config.recognition_max_latency_ms = max(0.0, config.recognition_max_latency_ms)
+        config.export_calibration_size = max(1, config.export_calibration_size)
+        config.warm_start_epochs = max(1, config.warm_start_epochs)
+        config.embedding_false_accept_rate = min(0.5, max(0.0, config.embedding_false_accept_rate))
+        config.near_duplicate_threshold = min(64, max(0, config.near_duplicate_threshold))
+        config.near_duplicate_cap = max(0, config.near_duplicate_cap)
+        config.member_image_cap = max(0, config.member_image_cap)
+        return config
@@ -1,24 +1,48 @@
 import os
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple, Dict, Optional
+from collections import defaultdict
+from typing import Any, Tuple, Dict, List, Optional, Union
 from functools import lru_cache
 from .preprocess import FacePreprocessor
-from .api_communicator import APIClient
+from .preprocess_pool import get_process_preprocessor
+from .face_cache import FaceCache
+from .member_store import MemberFeatureStore
+from .embedding import EmbeddingModel
+from .dataset import FaceDataset
+from .negatives import NegativeSet
+from .phash import phash, cap_near_duplicates
+from .api_communicator import APIClient, get_api_client
 
-from PIL import Image
-from sklearn.utils import shuffle
+import cv2
 
 class DataLoader:
     def __init__(
         self,
         base_url: str = "http://app:8000",
         landmark_path: str = "utils/shape_predictor_68_face_landmarks.dat",
-        max_workers: int = 1
+        max_workers: int = 1,
+        cache_dir: Optional[str] = "cache/faces",
+        cache_max_bytes: int = 2 * 1024 ** 3,
+        member_store: Optional[MemberFeatureStore] = None,
+        executor: str = "thread",
+        api_client: Optional[APIClient] = None,
+        negative_set: Optional[NegativeSet] = None
     ):
-        self.api_client = APIClient(base_url)
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor '{executor}', expected 'thread' or 'process'")
+
+        self.api_client = api_client or get_api_client(base_url)
+        self.landmark_path = landmark_path
         self.preprocessor = FacePreprocessor(landmark_path=landmark_path)
         self.max_workers = max_workers
+        self.executor = executor
+        self.face_cache = (
+            FaceCache(cache_dir, cache_max_bytes, params=self.preprocessor.params)
+            if cache_dir else None
+        )
+        self.member_store = member_store or get_member_store()
+        self.negative_set = negative_set or NegativeSet(output_size=self.preprocessor.output_size)
         self.label_map: Dict[int, int] = {}
         self.inverse_label_map: Dict[int, int] = {}
 
@@ -31,27 +55,189 @@ class DataLoader:
             f"{self.api_client.endpoints.member}{student_id}/"
         )
 
-    def _process_image(
-        self, 
-        image_data: dict
-    ) -> Tuple[Optional[np.ndarray], Optional[int]]:
+    def _process_image(self, image_data: dict) -> Optional[np.ndarray]:
         try:
             image_path = image_data.get('file_path')
-            student_id = image_data.get('member')
             
-            if not image_path or not student_id:
-                return None, None
+            if not image_path or not image_data.get('member'):
+                return None
 
             full_path = os.path.join('.', image_path) 
-            processed_face = self.preprocessor.preprocess_image(full_path)
-            
-            return (processed_face, student_id) if processed_face is not None else (None, None)
+            with open(full_path, 'rb') as f:
+                data = f.read()
+
+            key = None
+            if self.face_cache is not None:
+                key = self.face_cache.key_for_bytes(data)
+                face = self.face_cache.get(key)
+                if face is not None:
+                    return face if face.size else None
+
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                print(f"Cannot read image: {full_path}")
+                return None
+
+            face = self.preprocessor.align_face(image, full_path)
+            if key is not None:
+                # Remember images without a detectable face as empty entries
+                self.face_cache.put(key, face if face is not None else np.empty((0,), dtype=np.uint8))
+            return face
                 
         except Exception as e:
             print(f"Error processing image {image_data.get('file_path')}: {str(e)}")
-            return None, None
+            return None
+
+    def _process_images(self, images: List[dict]) -> Dict[int, Optional[np.ndarray]]:
+        if self.executor == "process" and self.max_workers > 1:
+            return self._process_images_in_pool(images)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(zip(
+                (image['id'] for image in images),
+                executor.map(self._process_image, images)
+            ))
+
+    def _process_images_in_pool(self, images: List[dict]) -> Dict[int, Optional[np.ndarray]]:
+        results: Dict[int, Optional[np.ndarray]] = {}
+        misses: List[Tuple[int, Optional[str], str]] = []
+
+        for image_data in images:
+            results[image_data['id']] = None
+            if not image_data.get('file_path') or not image_data.get('member'):
+                continue
+
+            full_path = os.path.join('.', image_data['file_path'])
+            key = None
+            if self.face_cache is not None:
+                try:
+                    with open(full_path, 'rb') as f:
+                        key = self.face_cache.key_for_bytes(f.read())
+                except OSError as e:
+                    print(f"Error processing image {image_data['file_path']}: {str(e)}")
+                    continue
+                face = self.face_cache.get(key)
+                if face is not None:
+                    results[image_data['id']] = face if face.size else None
+                    continue
+            misses.append((image_data['id'], key, full_path))
+
+        if misses:
+            pool = get_process_preprocessor(
+                self.landmark_path,
+                self.max_workers,
+                {
+                    "output_size": self.preprocessor.output_size,
+                    "margin": self.preprocessor.margin,
+                    "detect_max_side": self.preprocessor.detect_max_side,
+                }
+            )
+            faces, ok = pool.preprocess_batch([full_path for _, _, full_path in misses])
+
+            for (image_id, key, _), face, aligned in zip(misses, faces, ok):
+                if key is not None:
+                    self.face_cache.put(key, face if aligned else np.empty((0,), dtype=np.uint8))
+                results[image_id] = face if aligned else None
+
+        return results
+
+    def preprocess(self, images: List[dict]) -> int:
+        # Aligns images into the face cache ahead of training; returns how many had a face
+        faces = self._process_images([{**image, 'id': index} for index, image in enumerate(images)])
+        return sum(face is not None for face in faces.values())
+
+    @staticmethod
+    def group_by_member(images_data: List[dict]) -> Dict[int, List[dict]]:
+        by_member: Dict[int, List[dict]] = defaultdict(list)
+        for image_data in images_data:
+            if image_data.get('member'):
+                by_member[image_data['member']].append(image_data)
+        return by_member
+
+    def load_member_faces(self, images_data: List[dict]) -> Dict[int, Tuple[np.ndarray, List[int]]]:
+        faces: Dict[int, Tuple[np.ndarray, List[int]]] = {}
+        pending: Dict[int, Tuple[str, List[dict]]] = {}
+        for member_id, member_images in self.group_by_member(images_data).items():
+            fingerprint = MemberFeatureStore.fingerprint(member_images, self.preprocessor.params)
+            stored = self.member_store.load(member_id, "faces", fingerprint)
+            if stored is not None:
+                faces[member_id] = stored
+            else:
+                pending[member_id] = (fingerprint, member_images)
+
+        if pending:
+            processed = self._process_images(
+                [image for _, member_images in pending.values() for image in member_images]
+            )
+
+            for member_id, (fingerprint, member_images) in pending.items():
+                kept = [image['id'] for image in member_images if processed[image['id']] is not None]
+                member_faces = (
+                    np.stack([processed[image_id] for image_id in kept])
+                    if kept else np.empty(
+                        (0, self.preprocessor.output_size, self.preprocessor.output_size, 3),
+                        dtype=np.uint8
+                    )
+                )
+                self.member_store.save(member_id, "faces", fingerprint, kept, member_faces)
+                faces[member_id] = (member_faces, kept)
+
+        return faces
+
+    def load_member_hashes(
+        self,
+        images_data: List[dict],
+        member_faces: Dict[int, Tuple[np.ndarray, List[int]]]
+    ) -> Dict[int, np.ndarray]:
+        # Perceptual hashes sit next to the faces in the member store, one per image id
+        hashes: Dict[int, np.ndarray] = {}
+        for member_id, member_images in self.group_by_member(images_data).items():
+            faces, image_ids = member_faces[member_id]
+            fingerprint = MemberFeatureStore.fingerprint(member_images, self.preprocessor.params)
+            stored = self.member_store.load(member_id, "phash", fingerprint)
+            if stored is not None and stored[1] == image_ids:
+                hashes[member_id] = stored[0]
+            else:
+                hashes[member_id] = phash(faces)
+                self.member_store.save(member_id, "phash", fingerprint, image_ids, hashes[member_id])
+        return hashes
+
+    def embedding_fingerprint(self, member_images: List[dict], embedding_model: EmbeddingModel) -> str:
+        return MemberFeatureStore.fingerprint(
+            member_images,
+            {**self.preprocessor.params, "embedding": embedding_model.name}
+        )
 
-    def load_course_data(self, course_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    def load_member_embeddings(
+        self,
+        by_member: Dict[int, List[dict]],
+        embedding_model: EmbeddingModel
+    ) -> Dict[int, Tuple[str, np.ndarray]]:
+        kind = f"embedding_{embedding_model.name}"
+        embeddings: Dict[int, Tuple[str, np.ndarray]] = {}
+        missing: Dict[int, str] = {}
+
+        for member_id, member_images in by_member.items():
+            fingerprint = self.embedding_fingerprint(member_images, embedding_model)
+            stored = self.member_store.load(member_id, kind, fingerprint)
+            if stored is not None:
+                embeddings[member_id] = (fingerprint, stored[0])
+            else:
+                missing[member_id] = fingerprint
+
+        if missing:
+            faces = self.load_member_faces(
+                [image for member_id in missing for image in by_member[member_id]]
+            )
+            for member_id, fingerprint in missing.items():
+                member_faces, image_ids = faces[member_id]
+                member_embeddings = embedding_model.embed(member_faces)
+                self.member_store.save(member_id, kind, fingerprint, image_ids, member_embeddings)
+                embeddings[member_id] = (fingerprint, member_embeddings)
+
+        return embeddings
+
+    def fetch_training_images(self, course_id: int) -> List[dict]:
         if not self.api_client.token:
             raise ValueError("Not authenticated. Call authenticate() first.")
 
@@ -61,7 +247,7 @@ class DataLoader:
         )
 
         if not training_data:
-            return np.array([]), np.array([]), np.array([])
+            return []
 
         images_data = (
             training_data if isinstance(training_data, list) 
@@ -74,38 +260,82 @@ class DataLoader:
                 'http://app:8000', ''
             )
 
-        # Process images in parallel
-        X = []
-        y = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            results = list(executor.map(self._process_image, images_data))
-            
-            for processed_face, student_id in results:
-                if processed_face is not None and student_id is not None:
-                    X.append(processed_face)
-                    y.append(student_id)
-
-        unknown_folder = "preprocess_image/unknown"
-        if os.path.exists(unknown_folder):
-            for filename in os.listdir(unknown_folder):
-                if filename.endswith(('.jpg', '.jpeg', '.png')):
-                    image_path = os.path.join(unknown_folder, filename)
-                    try:
-                        image = Image.open(image_path).resize((224, 224))
-                        image = np.array(image) / 255.0  
-                        X.append(image)
-                        y.append("unknown")  
-                    except Exception as e:
-                        print(f"Error loading image {image_path}: {e}")
-        if not X:
+        return images_data
+
+    def load_course_data(
+        self,
+        course_id: int,
+        streaming: bool = False,
+        memmap_dir: Optional[str] = None,
+        near_duplicate_threshold: int = 6,
+        near_duplicate_cap: int = 0,
+        member_image_cap: int = 0
+    ) -> Tuple[Union[np.ndarray, FaceDataset], np.ndarray, Dict[int, Any]]:
+        images_data = self.fetch_training_images(course_id)
+        if not images_data:
+            return np.array([]), np.array([]), np.array([])
+
+        # Faces come from the shared member store; only new or changed members are processed
+        member_faces = self.load_member_faces(images_data)
+        if near_duplicate_cap > 0 or member_image_cap > 0:
+            # Keep at most near_duplicate_cap images from each burst of near-identical
+            # shots, and at most member_image_cap per member spread across the bursts
+            hashes = self.load_member_hashes(images_data, member_faces)
+            for member_id, (faces, image_ids) in member_faces.items():
+                keep = cap_near_duplicates(
+                    hashes[member_id], near_duplicate_threshold, near_duplicate_cap, member_image_cap
+                )
+                if len(keep) < len(faces):
+                    print(f"Member {member_id}: kept {len(keep)} of {len(faces)} images after near-duplicate collapse")
+                    member_faces[member_id] = (faces[keep], [image_ids[i] for i in keep])
+        # The shared unknown set is memory-mapped, never copied into the course buffer
+        unknown_faces = self.negative_set.load()
+
+        member_total = sum(len(faces) for faces, _ in member_faces.values())
+        total = member_total + len(unknown_faces)
+        if member_total == 0:
             return np.array([]), np.array([]), np.array([])
 
+        # Member faces go into one preallocated uint8 buffer (optionally file-backed)
+        size = self.preprocessor.output_size
+        shape = (member_total, size, size, 3)
+        if memmap_dir:
+            os.makedirs(memmap_dir, exist_ok=True)
+            X = np.lib.format.open_memmap(
+                os.path.join(memmap_dir, f"course_{course_id}.npy"),
+                mode='w+', dtype=np.uint8, shape=shape
+            )
+        else:
+            X = np.empty(shape, dtype=np.uint8)
+
+        y = []
+        offset = 0
+        for student_id, (faces, _) in member_faces.items():
+            X[offset:offset + len(faces)] = faces
+            offset += len(faces)
+            y.extend([student_id] * len(faces))
+        y.extend(["unknown"] * len(unknown_faces))
+        dataset = FaceDataset([X, unknown_faces])
+
         # Prepare and encode data
-        X = np.array(X)
         unique_labels = list(set(y))
         self.label_map = {label: idx for idx, label in enumerate(unique_labels)}
         self.inverse_label_map = {v: k for k, v in self.label_map.items()}
         y = np.array([self.label_map[label] for label in y])
 
-        X, y = shuffle(X, y, random_state=42)
-        return X, y, self.inverse_label_map
\ No newline at end of file
+        if streaming:
+            # Shuffling happens on index arrays inside the training pipeline
+            return dataset, y, self.inverse_label_map
+
+        order = np.random.default_rng(42).permutation(total)
+        X_float = dataset.take(order).astype(np.float32)
+        X_float /= 255.0
+        return X_float, y[order], self.inverse_label_map
+
+_member_store: Optional[MemberFeatureStore] = None
+
+def get_member_store() -> MemberFeatureStore:
+    global _member_store
+    if _member_store is None:
+        _member_store = MemberFeatureStore()
+    return _member_store
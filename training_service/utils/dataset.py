@@ -0,0 +1,41 @@
+import numpy as np
+from typing import List, Sequence, Tuple
+
+# uint8 face tensor made of one or more backing arrays (in-memory buffers or
+# memmaps). Rows are gathered per batch, so the full dataset is never copied
+# or converted to float.
+class FaceDataset:
+    def __init__(self, parts: Sequence[np.ndarray]):
+        self.parts: List[np.ndarray] = [part for part in parts if len(part)]
+        self._offsets = np.cumsum([0] + [len(part) for part in self.parts])
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def size(self) -> int:
+        return len(self) * int(np.prod(self.image_shape)) if self.parts else 0
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.parts[0].dtype if self.parts else np.dtype(np.uint8)
+
+    @property
+    def image_shape(self) -> Tuple[int, ...]:
+        return self.parts[0].shape[1:] if self.parts else (0,)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return (len(self),) + tuple(self.image_shape)
+
+    def take(self, indices: np.ndarray) -> np.ndarray:
+        indices = np.asarray(indices)
+        if len(self.parts) == 1:
+            return self.parts[0][indices]
+
+        batch = np.empty((len(indices),) + tuple(self.image_shape), dtype=np.uint8)
+        part_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+        for part_id in np.unique(part_ids):
+            mask = part_ids == part_id
+            batch[mask] = self.parts[part_id][indices[mask] - self._offsets[part_id]]
+        return batch
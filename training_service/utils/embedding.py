@@ -0,0 +1,163 @@
+import json
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_THRESHOLD = 0.5
+
+class EmbeddingModel:
+    # The name is part of every cached embedding's fingerprint; bump it whenever
+    # the input preprocessing changes
+    name = "mobilenetv2_avg_rgb"
+
+    def __init__(self, input_size: int = 224):
+        self.input_size = input_size
+        self._backbone = None
+
+    @property
+    def backbone(self):
+        if self._backbone is None:
+            from tensorflow.keras.applications import MobileNetV2
+
+            self._backbone = MobileNetV2(
+                weights='imagenet',
+                include_top=False,
+                pooling='avg',
+                input_shape=(self.input_size, self.input_size, 3)
+            )
+            self._backbone.trainable = False
+        return self._backbone
+
+    @property
+    def dim(self) -> int:
+        return int(self.backbone.output_shape[-1])
+
+    def embed(self, faces: np.ndarray, batch_size: int = 64) -> np.ndarray:
+        if len(faces) == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        embeddings = np.empty((len(faces), self.dim), dtype=np.float32)
+        for start in range(0, len(faces), batch_size):
+            # Aligned crops are BGR (OpenCV); the frozen ImageNet backbone expects RGB
+            batch = faces[start:start + batch_size][..., ::-1]
+            if batch.dtype == np.uint8:
+                batch = batch.astype(np.float32) / 255.0
+            # MobileNetV2 expects inputs in [-1, 1]
+            batch = batch * 2.0 - 1.0
+            embeddings[start:start + len(batch)] = self.backbone(batch, training=False).numpy()
+
+        return l2_normalize(embeddings)
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+# Per-course gallery of L2-normalized member embeddings. Rows live in a
+# preallocated matrix that doubles when full, so enrolling a member is an
+# amortized O(1) append instead of a retrain.
+class CourseGallery:
+    def __init__(self, dim: int, capacity: int = 256, threshold: float = DEFAULT_THRESHOLD):
+        self.dim = dim
+        self.threshold = threshold
+        self.size = 0
+        self.embeddings = np.empty((capacity, dim), dtype=np.float32)
+        self.labels = np.empty((capacity,), dtype=np.int64)
+        self.fingerprints: Dict[int, str] = {}
+
+    @property
+    def members(self) -> List[int]:
+        return list(self.fingerprints)
+
+    def add(self, member_id: int, embeddings: np.ndarray, fingerprint: str = "") -> None:
+        count = len(embeddings)
+        if self.size + count > len(self.embeddings):
+            capacity = max(len(self.embeddings) * 2, self.size + count)
+            self.embeddings = np.resize(self.embeddings, (capacity, self.dim))
+            self.labels = np.resize(self.labels, (capacity,))
+
+        self.embeddings[self.size:self.size + count] = embeddings
+        self.labels[self.size:self.size + count] = member_id
+        self.size += count
+        self.fingerprints[member_id] = fingerprint
+
+    def remove(self, member_ids: Iterable[int]) -> None:
+        member_ids = list(member_ids)
+        if not member_ids:
+            return
+
+        keep = ~np.isin(self.labels[:self.size], member_ids)
+        kept = int(keep.sum())
+        self.embeddings[:kept] = self.embeddings[:self.size][keep]
+        self.labels[:kept] = self.labels[:self.size][keep]
+        self.size = kept
+        for member_id in member_ids:
+            self.fingerprints.pop(member_id, None)
+
+    def recognize(
+        self,
+        queries: np.ndarray,
+        k: int = 5,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[Optional[int], float]]:
+        threshold = self.threshold if threshold is None else threshold
+        if self.size == 0:
+            return [(None, 0.0)] * len(queries)
+
+        gallery = self.embeddings[:self.size]
+        similarities = l2_normalize(queries.astype(np.float32)) @ gallery.T
+
+        k = min(k, self.size)
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(similarities, top, axis=1)
+        top_labels = self.labels[top]
+
+        # Similarity-weighted vote: score each neighbour by the total similarity of
+        # all neighbours sharing its label, then pick the best neighbour per query.
+        same_label = top_labels[:, :, None] == top_labels[:, None, :]
+        votes = (same_label * top_sims[:, None, :]).sum(axis=2)
+        best = votes.argmax(axis=1)
+
+        rows = np.arange(len(queries))
+        labels = top_labels[rows, best]
+        confidences = np.where(same_label[rows, best], top_sims, -np.inf).max(axis=1)
+
+        return [
+            (int(label), float(confidence)) if confidence >= threshold else (None, float(confidence))
+            for label, confidence in zip(labels, confidences)
+        ]
+
+    def calibrate(self, negatives: np.ndarray, false_accept_rate: float = 0.01) -> float:
+        # Pick the threshold that lets through only false_accept_rate of the
+        # embeddings of faces that belong to nobody in the course
+        if self.size == 0 or len(negatives) == 0:
+            return self.threshold
+        confidences = np.array([confidence for _, confidence in self.recognize(negatives, threshold=np.inf)])
+        self.threshold = float(np.quantile(confidences, 1.0 - false_accept_rate))
+        return self.threshold
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                embeddings=self.embeddings[:self.size],
+                labels=self.labels[:self.size],
+                threshold=np.array(self.threshold, dtype=np.float32),
+                fingerprints=np.array(json.dumps(self.fingerprints))
+            )
+
+    @classmethod
+    def load(cls, path: str) -> 'CourseGallery':
+        with np.load(path) as data:
+            embeddings = data['embeddings']
+            gallery = cls(
+                dim=embeddings.shape[1],
+                capacity=max(256, len(embeddings)),
+                threshold=float(data['threshold']) if 'threshold' in data.files else DEFAULT_THRESHOLD
+            )
+            gallery.size = len(embeddings)
+            gallery.embeddings[:gallery.size] = embeddings
+            gallery.labels[:gallery.size] = data['labels']
+            gallery.fingerprints = {
+                int(member_id): fingerprint
+                for member_id, fingerprint in json.loads(str(data['fingerprints'])).items()
+            }
+        return gallery
@@ -0,0 +1,76 @@
+import os
+import logging
+import numpy as np
+from typing import Dict, Iterable
+
+from .dataset import FaceDataset
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("tflite", "onnx")
+
+def calibration_sample(X, count: int = 200, seed: int = 0) -> np.ndarray:
+    # Calibration faces as float32 in [0, 1], the same range the model was trained on
+    indices = np.sort(np.random.default_rng(seed).permutation(len(X))[:count])
+    faces = X.take(indices) if isinstance(X, FaceDataset) else X[indices]
+    if faces.dtype == np.uint8:
+        return faces.astype(np.float32) / 255.0
+    return faces.astype(np.float32, copy=False)
+
+def export_tflite(model, calibration_faces: np.ndarray, path: str) -> str:
+    import tensorflow as tf
+
+    def representative_dataset():
+        for face in calibration_faces:
+            yield [face[np.newaxis]]
+
+    # Full-integer post-training quantization. The input is uint8 with a scale of
+    # ~1/255, so devices can feed raw pixels; the output stays float probabilities.
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+
+    tflite_model = converter.convert()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, path)
+    return path
+
+def export_onnx(model, path: str) -> str:
+    # tf2onnx is optional; the float ONNX graph is for runtimes that cannot load TFLite
+    import tf2onnx
+    import tensorflow as tf
+
+    spec = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=path)
+    return path
+
+def export_model(model_path: str, X, formats: Iterable[str], calibration_size: int = 200) -> Dict[str, str]:
+    formats = [fmt for fmt in formats if fmt in EXPORT_FORMATS]
+    if not formats:
+        return {}
+
+    from tensorflow.keras.models import load_model
+
+    # Export the best checkpoint, i.e. exactly what /download serves as .keras
+    model = load_model(model_path)
+    base_path = os.path.splitext(model_path)[0]
+    exported = {}
+
+    for fmt in formats:
+        try:
+            if fmt == "tflite":
+                faces = calibration_sample(X, calibration_size)
+                exported[fmt] = export_tflite(model, faces, f"{base_path}_int8.tflite")
+            elif fmt == "onnx":
+                exported[fmt] = export_onnx(model, f"{base_path}.onnx")
+            logger.info(f"Exported {model_path} as {fmt} ({os.path.getsize(exported[fmt]) / 1e6:.1f} MB)")
+        except ImportError as e:
+            logger.warning(f"Skipping {fmt} export of {model_path}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to export {model_path} as {fmt}: {e}")
+
+    return exported
@@ -0,0 +1,115 @@
+import os
+import json
+import fcntl
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Dict, Optional
+
+# Aligned uint8 face crops on disk, keyed by image content hash + preprocessing params.
+# Hits refresh the entry mtime so eviction can drop least recently used files first.
+# The total size is a running counter in a small file shared (under flock) by every
+# process using the cache, so opening a cache never rescans it; only the first put
+# into a cache without a counter, and eviction, walk the entries.
+class FaceCache:
+    def __init__(
+        self,
+        cache_dir: str = "cache/faces",
+        max_bytes: int = 2 * 1024 ** 3,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.params_digest = hashlib.sha256(
+            json.dumps(params or {}, sort_keys=True).encode()
+        ).hexdigest()
+        self._lock = threading.Lock()
+        self._size_path = os.path.join(self.cache_dir, "size")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entries(self):
+        # Yields (path, mtime, size). Other training processes share the cache and
+        # may delete entries while we scan, so vanished files are just skipped.
+        for subdir in os.scandir(self.cache_dir):
+            if not subdir.is_dir():
+                continue
+            try:
+                entries = list(os.scandir(subdir.path))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith('.npy'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def key_for_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data)
+        digest.update(self.params_digest.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        try:
+            face = np.load(path)
+            os.utime(path)
+            return face
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, face: np.ndarray) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(face, dtype=np.uint8))
+        size = os.path.getsize(tmp_path)
+        try:
+            # Overwriting an entry only adds the difference
+            size -= os.path.getsize(path)
+        except OSError:
+            pass
+        os.replace(tmp_path, path)
+
+        with self._lock, open(self._size_path, 'a+') as counter:
+            fcntl.flock(counter, fcntl.LOCK_EX)
+            counter.seek(0)
+            content = counter.read().strip()
+            # Without a counter yet, the scan already includes the entry just written
+            total = int(content) + size if content else self.scan_size()
+            if total > self.max_bytes:
+                total = self._evict()
+            counter.seek(0)
+            counter.truncate()
+            counter.write(str(total))
+
+    def scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self) -> int:
+        # Evict down to 90% so that a full cache doesn't rescan on every put
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Another process evicted it first; its bytes are gone either way
+                pass
+            except OSError:
+                continue
+            total -= size
+
+        return total
@@ -0,0 +1,120 @@
+import os
+import re
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Content-hash ETags keyed by (path, mtime, size), so each artifact is hashed
+# once per version instead of on every poll.
+class ETagCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._etags: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stat: os.stat_result) -> str:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            etag = self._etags.get(key)
+        if etag is not None:
+            return etag
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        etag = f'"{digest.hexdigest()}"'
+
+        with self._lock:
+            # Drop entries for older versions of the same file
+            for stale in [k for k in self._etags if k[0] == path]:
+                del self._etags[stale]
+            if len(self._etags) >= self.max_entries:
+                self._etags.pop(next(iter(self._etags)))
+            self._etags[key] = etag
+        return etag
+
+etag_cache = ETagCache()
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    # Single byte ranges only; multipart ranges fall back to the full body
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        length = int(end)
+        return (max(0, size - length), size - 1) if length else (size, size - 1)
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+def _iter_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = f.read(min(CHUNK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+async def file_response(
+    request: Request,
+    path: str,
+    filename: str,
+    media_type: str = "application/octet-stream",
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None
+) -> Response:
+    stat = os.stat(path)
+    if etag is None:
+        etag = await asyncio.to_thread(etag_cache.get, path, stat)
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "no-cache"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # A resumed download only gets a partial body if the file has not changed since
+        if_range = request.headers.get("if-range")
+        if not if_range or if_range.strip() == etag:
+            byte_range = _parse_range(range_header, size)
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_iter_file(path, 0, size - 1), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    if start >= size or start > end:
+        headers.pop("Content-Disposition")
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file(path, start, end), status_code=206, media_type=media_type, headers=headers
+    )
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .embedding import EmbeddingModel, CourseGallery
+
+Prediction = Tuple[Optional[int], float]
+
+class LoadedModel:
+    def __init__(self, course_id: int, version: int, engine: str, model: Any, labels: Dict[int, Any]):
+        self.course_id = course_id
+        self.version = version
+        self.engine = engine
+        self.model = model
+        self.labels = labels
+
+    def predict(self, faces: np.ndarray, embedding_model: Optional[EmbeddingModel] = None) -> List[Prediction]:
+        if len(faces) == 0:
+            return []
+
+        if self.engine == "embedding":
+            return self.model.recognize(embedding_model.embed(faces))
+
+        batch = faces.astype(np.float32)
+        batch /= 255.0
+        probabilities = np.asarray(self.model(batch, training=False))
+        best = probabilities.argmax(axis=1)
+        results = []
+        for index, confidence in zip(best, probabilities[np.arange(len(best)), best]):
+            label = self.labels.get(int(index))
+            member_id = None if label in (None, "unknown") else int(label)
+            results.append((member_id, float(confidence)))
+        return results
+
+# LRU of loaded course models keyed by (course_id, model_version). A course only
+# ever keeps its newest version; loading a newer one evicts the old entry, which
+# is how a retrained model gets hot-swapped in.
+class ModelCache:
+    def __init__(
+        self,
+        max_models: int = 8,
+        resolve_ttl: float = 30.0,
+        embedding_model: Optional[EmbeddingModel] = None
+    ):
+        self.max_models = max_models
+        self.resolve_ttl = resolve_ttl
+        self.embedding_model = embedding_model or EmbeddingModel()
+        self._models: "OrderedDict[Tuple[int, int], LoadedModel]" = OrderedDict()
+        self._resolved: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[int, int], threading.Lock] = {}
+
+    def cached_face_model(self, course_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._resolved.get(course_id)
+        if entry and time.monotonic() - entry[0] < self.resolve_ttl:
+            return entry[1]
+        return None
+
+    def remember_face_model(self, course_id: int, face_model: Dict[str, Any]) -> None:
+        self._resolved[course_id] = (time.monotonic(), face_model)
+
+    def invalidate(self, course_id: int) -> None:
+        # Forget the resolved FaceModel so the next request picks up a new version
+        self._resolved.pop(course_id, None)
+
+    def get(self, face_model: Dict[str, Any]) -> LoadedModel:
+        key = (int(face_model["course"]), int(face_model["model_version"]))
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is not None:
+                self._models.move_to_end(key)
+                return loaded
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same version wait for a single load
+        with load_lock:
+            with self._lock:
+                loaded = self._models.get(key)
+            if loaded is None:
+                loaded = self._load(face_model)
+                with self._lock:
+                    for stale in [k for k in self._models if k[0] == key[0] and k != key]:
+                        del self._models[stale]
+                    self._models[key] = loaded
+                    while len(self._models) > self.max_models:
+                        self._models.popitem(last=False)
+                    self._load_locks.pop(key, None)
+        return loaded
+
+    def _load(self, face_model: Dict[str, Any]) -> LoadedModel:
+        model_path = face_model.get("model_path")
+        if not model_path or not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file '{model_path}' does not exist.")
+
+        engine = face_model.get("engine", "softmax")
+        labels: Dict[int, Any] = {}
+        label_map_path = face_model.get("inverse_label_map")
+        if label_map_path and os.path.exists(label_map_path):
+            with open(label_map_path, "r") as f:
+                labels = {int(k): v for k, v in json.load(f).items()}
+
+        if engine == "embedding":
+            model = CourseGallery.load(model_path)
+        else:
+            from tensorflow.keras.models import load_model
+            model = load_model(model_path)
+
+        return LoadedModel(
+            course_id=int(face_model["course"]),
+            version=int(face_model["model_version"]),
+            engine=engine,
+            model=model,
+            labels=labels
+        )
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# Per-member features (aligned faces, embeddings, ...) shared by every course the
+# member is enrolled in. Each entry is tagged with a fingerprint of the member's
+# TrainingImage set, so adding, removing or replacing an image invalidates it.
+class MemberFeatureStore:
+    def __init__(self, store_dir: str = "cache/members", max_memory_bytes: int = 512 * 1024 ** 2):
+        self.store_dir = store_dir
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[Tuple[int, str], Tuple[str, np.ndarray, List[int]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @staticmethod
+    def fingerprint(images: List[dict], params: Optional[Dict[str, Any]] = None) -> str:
+        digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True).encode())
+        for image in sorted(images, key=lambda image: image['id']):
+            digest.update(f"{image['id']}:{image['file_path']};".encode())
+        return digest.hexdigest()
+
+    def _paths(self, member_id: int, kind: str) -> Tuple[str, str]:
+        member_dir = os.path.join(self.store_dir, f"member_{member_id}")
+        return (
+            os.path.join(member_dir, f"{kind}.npy"),
+            os.path.join(member_dir, f"{kind}.json")
+        )
+
+    def load(
+        self,
+        member_id: int,
+        kind: str,
+        fingerprint: str
+    ) -> Optional[Tuple[np.ndarray, List[int]]]:
+        with self._lock:
+            cached = self._memory.get((member_id, kind))
+            if cached and cached[0] == fingerprint:
+                self._memory.move_to_end((member_id, kind))
+                return cached[1], cached[2]
+
+        array_path, manifest_path = self._paths(member_id, kind)
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('fingerprint') != fingerprint:
+                return None
+            features = np.load(array_path)
+        except (OSError, ValueError):
+            return None
+
+        image_ids = manifest.get('image_ids', [])
+        self._remember((member_id, kind), (fingerprint, features, image_ids))
+        return features, image_ids
+
+    def save(
+        self,
+        member_id: int,
+        kind: str,
+        fingerprint: str,
+        image_ids: List[int],
+        features: np.ndarray
+    ) -> None:
+        array_path, manifest_path = self._paths(member_id, kind)
+        os.makedirs(os.path.dirname(array_path), exist_ok=True)
+
+        # Write the array first and the manifest last; a crash in between leaves a
+        # manifest with the old fingerprint, which simply misses on the next load.
+        tmp_path = f"{array_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, features)
+        os.replace(tmp_path, array_path)
+
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'image_ids': image_ids}, f)
+        os.replace(tmp_path, manifest_path)
+
+        self._remember((member_id, kind), (fingerprint, features, image_ids))
+
+    def _remember(self, key: Tuple[int, str], entry: Tuple[str, np.ndarray, List[int]]) -> None:
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[1].nbytes
+            self._memory[key] = entry
+            self._memory_bytes += entry[1].nbytes
+
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted[1].nbytes
@@ -1,13 +1,140 @@
 from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
-from tensorflow.keras.models import Model
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
+from tensorflow.keras.layers import Add, Dense, GlobalAveragePooling2D, Dropout, Input
+from tensorflow.keras.models import Model, load_model
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import Callback, ModelCheckpoint, EarlyStopping
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
+from tensorflow.keras.utils import Sequence
 from sklearn.model_selection import train_test_split
+import tensorflow as tf
+import numpy as np
+import time
+import os
+
+from .dataset import FaceDataset
+
+class FaceBatchSequence(Sequence):
+    def __init__(self, X, y, indices, batch_size=32, datagen=None, shuffle=True, **kwargs):
+        super().__init__(**kwargs)
+        self.X = X
+        self.y = y
+        self.indices = np.array(indices)
+        self.batch_size = batch_size
+        self.datagen = datagen
+        self.shuffle = shuffle
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
+
+    def __getitem__(self, index):
+        batch_indices = np.sort(self.indices[index * self.batch_size:(index + 1) * self.batch_size])
+        batch = self.X.take(batch_indices) if isinstance(self.X, FaceDataset) else self.X[batch_indices]
+
+        # Normalise per batch; the dataset itself stays uint8
+        batch = batch.astype(np.float32)
+        batch /= 255.0
+        if self.datagen is not None:
+            for i in range(len(batch)):
+                batch[i] = self.datagen.random_transform(batch[i])
+
+        return batch, self.y[batch_indices]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+class ThroughputCallback(Callback):
+    def __init__(self, samples_per_epoch, label=""):
+        super().__init__()
+        self.samples_per_epoch = samples_per_epoch
+        self.label = label
+        self.images_per_sec = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        rate = self.samples_per_epoch / max(time.perf_counter() - self._start, 1e-9)
+        self.images_per_sec.append(rate)
+        if logs is not None:
+            logs['images_per_sec'] = rate
+        print(f"[{self.label}] epoch {epoch + 1}: {rate:.1f} images/sec")
+
+def build_augmentation():
+    # Batched counterpart of the ImageDataGenerator settings used by the generator pipeline
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomFlip("horizontal"),
+        tf.keras.layers.RandomRotation(20 / 360),
+        tf.keras.layers.RandomTranslation(0.2, 0.2),
+        tf.keras.layers.RandomZoom(0.2),
+    ], name="augmentation")
+
+def make_tf_dataset(X, y, indices, batch_size=32, training=True, cache=False, augmentation=None):
+    scale = 1 / 255.0 if X.dtype == np.uint8 else 1.0
+    image_shape = tuple(X.image_shape) if isinstance(X, FaceDataset) else X.shape[1:]
+
+    def gather(batch_indices):
+        return X.take(batch_indices) if isinstance(X, FaceDataset) else X[batch_indices]
+
+    def load(batch_indices):
+        # One numpy_function call per batch: a per-sample call holds the GIL for
+        # every image, so parallel map calls could not overlap the gathers
+        images = tf.numpy_function(gather, [batch_indices], tf.as_dtype(X.dtype))
+        images.set_shape((None,) + tuple(image_shape))
+        return tf.cast(images, tf.float32) * scale, tf.gather(labels, batch_indices)
+
+    labels = tf.constant(y)
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices))
+    if cache:
+        # Caches the decoded, normalised but un-augmented images after the first
+        # epoch; they are reshuffled and rebatched from the cache every epoch
+        dataset = dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE).cache()
+        if training:
+            dataset = dataset.unbatch().shuffle(len(indices), reshuffle_each_iteration=True).batch(batch_size)
+    else:
+        if training:
+            dataset = dataset.shuffle(len(indices), reshuffle_each_iteration=True)
+        dataset = dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE)
+    if training and augmentation is not None:
+        dataset = dataset.map(
+            lambda images, targets: (augmentation(images, training=True), targets),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+class FeatureSequence(Sequence):
+    def __init__(self, features, y, batch_size=32, shuffle=True, **kwargs):
+        super().__init__(**kwargs)
+        self.features = features
+        self.y = y
+        self.indices = np.arange(len(y))
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        if self.shuffle:
+            np.random.shuffle(self.indices)
+
+    def __len__(self):
+        return int(np.ceil(len(self.indices) / self.batch_size))
+
+    def __getitem__(self, index):
+        batch_indices = np.sort(self.indices[index * self.batch_size:(index + 1) * self.batch_size])
+        return self.features[batch_indices].astype(np.float32), self.y[batch_indices]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            np.random.shuffle(self.indices)
 
 class FaceRecognitionModel:
-    def __init__(self, num_classes):
+    # Number of trailing MobileNetV2 layers left trainable (block_15 + block_16 + Conv_1)
+    trainable_tail = 20
+
+    def __init__(self, num_classes, learning_rate=1e-3):
         self.num_classes = num_classes
+        self.learning_rate = learning_rate
+        self.base_model = None
+        self.head_layers = []
         
     def build_model(self):
         base_model = MobileNetV2(
@@ -17,40 +144,152 @@ class FaceRecognitionModel:
         )
         
         # Freeze early layers
-        for layer in base_model.layers[:-20]:
+        for layer in base_model.layers[:-self.trainable_tail]:
             layer.trainable = False
         
-        x = base_model.output
-        x = GlobalAveragePooling2D()(x)
-        x = Dense(512, activation='relu')(x)
-        x = Dropout(0.5)(x)
-        x = Dense(256, activation='relu')(x)
-        x = Dropout(0.3)(x)
-        predictions = Dense(self.num_classes, activation='softmax')(x)
+        self.base_model = base_model
+        # Fixed names keep weight paths stable across runs in a long-lived process,
+        # which the chunked artifacts and device-side assign_tensors rely on
+        self.head_layers = [
+            GlobalAveragePooling2D(name='head_pool'),
+            Dense(512, activation='relu', name='head_dense_1'),
+            Dropout(0.5, name='head_dropout_1'),
+            Dense(256, activation='relu', name='head_dense_2'),
+            Dropout(0.3, name='head_dropout_2'),
+            Dense(self.num_classes, activation='softmax', name='head_output'),
+        ]
+
+        predictions = self._apply_head(base_model.output)
         
         model = Model(inputs=base_model.input, outputs=predictions)
         model.compile(
-            optimizer='adam',
+            optimizer=Adam(self.learning_rate),
             loss='sparse_categorical_crossentropy',
             metrics=['accuracy']
         )
         
         return model
+
+    def _apply_head(self, x):
+        for layer in self.head_layers:
+            x = layer(x)
+        return x
+
+    def warm_start(self, model, previous_path, column_map):
+        # column_map[j] is the previous model's output column for class j, or -1 for a
+        # new class. Backbone and hidden head layers are copied as-is; softmax columns
+        # of retained classes are carried over and new ones keep their fresh init.
+        previous = load_model(previous_path)
+        backbone = len(self.base_model.layers)
+        previous_dense = [layer for layer in previous.layers[backbone:] if isinstance(layer, Dense)]
+        dense = [layer for layer in self.head_layers if isinstance(layer, Dense)]
+        if len(previous.layers) != backbone + len(self.head_layers) or len(previous_dense) != len(dense):
+            print(f"[warm start] {previous_path} has a different architecture, training from scratch")
+            return False
+
+        pairs = list(zip(self.base_model.layers, previous.layers[:backbone])) + list(zip(dense[:-1], previous_dense[:-1]))
+        for layer, previous_layer in pairs:
+            if [w.shape for w in previous_layer.weights] != [w.shape for w in layer.weights]:
+                print(f"[warm start] Layer {layer.name} does not match {previous_path}, training from scratch")
+                return False
+
+        kernel, bias = dense[-1].get_weights()
+        previous_kernel, previous_bias = previous_dense[-1].get_weights()
+        column_map = np.asarray(column_map)
+        retained = column_map >= 0
+        if previous_kernel.shape[0] != kernel.shape[0] or column_map.max(initial=-1) >= previous_kernel.shape[1]:
+            print(f"[warm start] Output layer of {previous_path} does not match its label map, training from scratch")
+            return False
+
+        for layer, previous_layer in pairs:
+            layer.set_weights(previous_layer.get_weights())
+        kernel[:, retained] = previous_kernel[:, column_map[retained]]
+        bias[retained] = previous_bias[column_map[retained]]
+        dense[-1].set_weights([kernel, bias])
+
+        print(f"[warm start] Reused {retained.sum()}/{len(column_map)} classes from {previous_path}")
+        return True
+
+    def build_split_models(self):
+        # Split the network at the frozen/trainable boundary. The tail model reuses
+        # the same layer objects, so training it trains the full model's weights.
+        tail = self.base_model.layers[-self.trainable_tail:]
+        if sum(isinstance(layer, Add) for layer in tail) != 1:
+            raise ValueError("Unexpected MobileNetV2 layout for feature caching")
+
+        split_output = self.base_model.layers[-self.trainable_tail - 1].output
+        trunk = Model(inputs=self.base_model.input, outputs=split_output)
+
+        features_in = Input(shape=split_output.shape[1:])
+        x = features_in
+        for layer in tail:
+            # The only residual connection in the tail skips from the split point
+            x = layer([features_in, x]) if isinstance(layer, Add) else layer(x)
+
+        tail_model = Model(inputs=features_in, outputs=self._apply_head(x))
+        tail_model.compile(
+            optimizer=Adam(self.learning_rate),
+            loss='sparse_categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        return trunk, tail_model
+
+    def precompute_features(self, trunk, X, indices, path, draws=1, augmentation=None, batch_size=64):
+        shape = (len(indices) * draws,) + tuple(trunk.output_shape[1:])
+        features = np.lib.format.open_memmap(path, mode='w+', dtype=np.float16, shape=shape)
+
+        for draw in range(draws):
+            for start in range(0, len(indices), batch_size):
+                batch_indices = indices[start:start + batch_size]
+                batch = X.take(batch_indices) if isinstance(X, FaceDataset) else X[batch_indices]
+                batch = batch.astype(np.float32)
+                if X.dtype == np.uint8:
+                    batch /= 255.0
+                # Draw 0 is the un-augmented image, later draws are fixed augmentations
+                if draw > 0 and augmentation is not None:
+                    batch = augmentation(batch, training=True)
+
+                offset = draw * len(indices) + start
+                features[offset:offset + len(batch_indices)] = trunk(batch, training=False).numpy()
+
+        features.flush()
+        return features
     
-    def train(self, X, y, batch_size=32, epochs=10, model_path='best_face_model.keras'):
+    def train(
+        self, X, y, batch_size=32, epochs=10, model_path='best_face_model.keras',
+        pipeline='generator', cache_dataset=False, feature_draws=4, feature_dir='cache/features',
+        warm_start_path=None, column_map=None, warm_start_epochs=None, warm_start_learning_rate=1e-4
+    ):
+        if pipeline not in ('generator', 'tfdata', 'features'):
+            raise ValueError(
+                f"Unknown input pipeline '{pipeline}', expected 'generator', 'tfdata' or 'features'"
+            )
+
         model = self.build_model()
+        # Weights are copied before the checkpoint callback overwrites the file
+        if warm_start_path is not None and self.warm_start(model, warm_start_path, column_map):
+            # Fine-tune from the previous optimum: smaller steps, fewer epochs
+            self.learning_rate = warm_start_learning_rate
+            model.compile(
+                optimizer=Adam(self.learning_rate),
+                loss='sparse_categorical_crossentropy',
+                metrics=['accuracy']
+            )
+            epochs = warm_start_epochs or epochs
 
         if len(set(y)) > len(y) * 0.2:
             test_size = 0.2
         else:
             test_size = max(1, len(set(y))) / len(y)
 
+        # Split indices rather than arrays so a uint8 FaceDataset is never copied
+        indices = np.arange(len(y))
         try:
-            X_train, X_val, y_train, y_val = train_test_split(
-                X, y, test_size=test_size, stratify=y, random_state=42
+            train_idx, val_idx = train_test_split(
+                indices, test_size=test_size, stratify=y, random_state=42
             )
         except ValueError:
-            X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=test_size, random_state=42)
+            train_idx, val_idx = train_test_split(indices, test_size=test_size, random_state=42)
 
         train_datagen = ImageDataGenerator(
             rotation_range=20,
@@ -61,7 +300,26 @@ class FaceRecognitionModel:
             horizontal_flip=True
         )
 
-        train_generator = train_datagen.flow(X_train, y_train, batch_size=batch_size)
+        if pipeline == 'features':
+            return self._train_on_features(
+                model, X, y, train_idx, val_idx, batch_size, epochs, model_path,
+                feature_draws, feature_dir
+            )
+
+        if pipeline == 'tfdata':
+            train_generator = make_tf_dataset(
+                X, y, train_idx, batch_size, training=True,
+                cache=cache_dataset, augmentation=build_augmentation()
+            )
+            validation_data = make_tf_dataset(
+                X, y, val_idx, batch_size, training=False, cache=cache_dataset
+            )
+        elif isinstance(X, FaceDataset):
+            train_generator = FaceBatchSequence(X, y, train_idx, batch_size, datagen=train_datagen)
+            validation_data = FaceBatchSequence(X, y, val_idx, batch_size, shuffle=False)
+        else:
+            train_generator = train_datagen.flow(X[train_idx], y[train_idx], batch_size=batch_size)
+            validation_data = (X[val_idx], y[val_idx])
 
         # Callbacks
         checkpoint = ModelCheckpoint(
@@ -78,11 +336,55 @@ class FaceRecognitionModel:
             restore_best_weights=True
         )
 
+        throughput = ThroughputCallback(len(train_idx), label=pipeline)
+
         history = model.fit(
             train_generator,
             epochs=epochs,
-            validation_data=(X_val, y_val),  
-            callbacks=[checkpoint, early_stopping]
+            validation_data=validation_data,
+            callbacks=[checkpoint, early_stopping, throughput]
+        )
+
+        return model, history
+
+    def _train_on_features(
+        self, model, X, y, train_idx, val_idx, batch_size, epochs, model_path,
+        feature_draws, feature_dir
+    ):
+        # Stage 1: push every image (plus a fixed set of augmentation draws) through the
+        # frozen trunk once. Stage 2: train only the tail and head on the cached activations.
+        trunk, tail_model = self.build_split_models()
+        os.makedirs(feature_dir, exist_ok=True)
+        prefix = os.path.join(feature_dir, os.path.splitext(os.path.basename(model_path))[0])
+
+        start = time.perf_counter()
+        train_features = self.precompute_features(
+            trunk, X, train_idx, f"{prefix}_train.npy",
+            draws=feature_draws, augmentation=build_augmentation()
         )
+        val_features = self.precompute_features(trunk, X, val_idx, f"{prefix}_val.npy")
+        print(f"[features] cached {len(train_features) + len(val_features)} activations "
+              f"in {time.perf_counter() - start:.1f}s")
+
+        train_labels = np.tile(y[train_idx], feature_draws)
+        early_stopping = EarlyStopping(
+            monitor='val_accuracy',
+            patience=10,
+            restore_best_weights=True
+        )
+        throughput = ThroughputCallback(len(train_labels), label='features')
+
+        history = tail_model.fit(
+            FeatureSequence(train_features, train_labels, batch_size),
+            epochs=epochs,
+            validation_data=FeatureSequence(val_features, y[val_idx], batch_size, shuffle=False),
+            callbacks=[early_stopping, throughput]
+        )
+
+        # The full model shares its tail and head layers with tail_model
+        model.save(model_path)
 
-        return model, history
\ No newline at end of file
+        del train_features, val_features
+        for suffix in ("train", "val"):
+            os.remove(f"{prefix}_{suffix}.npy")
+        return model, history
@@ -0,0 +1,127 @@
+import os
+import json
+import glob
+import hashlib
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# The shared "unknown" class, compiled once into a uint8 .npy next to a manifest
+# of the source files (name, size, mtime). Course datasets memory-map it
+# read-only, so every training process shares the same pages, and it is only
+# rebuilt when the contents of the source folder change.
+class NegativeSet:
+    def __init__(
+        self,
+        source_dir: str = "preprocess_image/unknown",
+        output_dir: str = "cache/negatives",
+        output_size: int = 224
+    ):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.output_size = output_size
+        self.manifest_path = os.path.join(output_dir, "manifest.json")
+
+    def scan(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.source_dir):
+            return []
+        entries = [
+            entry for entry in os.scandir(self.source_dir)
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+        return [
+            {"name": entry.name, "size": entry.stat().st_size, "mtime_ns": entry.stat().st_mtime_ns}
+            for entry in sorted(entries, key=lambda entry: entry.name)
+        ]
+
+    def digest(self, files: List[Dict[str, Any]]) -> str:
+        payload = json.dumps({"output_size": self.output_size, "files": files}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def load(self) -> np.ndarray:
+        files = self.scan()
+        digest = self.digest(files)
+        manifest = self.read_manifest()
+        stale = manifest is None or manifest["digest"] != digest or (
+            manifest["count"] > 0 and not os.path.exists(self._data_path(manifest))
+        )
+        if stale:
+            manifest = self.build(files)
+        if manifest["count"] == 0:
+            return np.empty((0, self.output_size, self.output_size, 3), dtype=np.uint8)
+        return np.load(self._data_path(manifest), mmap_mode='r')
+
+    def build(self, files: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        files = self.scan() if files is None else files
+        digest = self.digest(files)
+        previous = self.read_manifest()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        size = self.output_size
+        data_path = os.path.join(self.output_dir, f"negatives_{digest[:16]}.npy")
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        count = 0
+        included = []
+        if files:
+            count, included = self._write_faces(files, tmp_path)
+            os.replace(tmp_path, data_path)
+
+        manifest = {
+            "version": (previous or {}).get("version", 0) + 1,
+            "digest": digest,
+            "output_size": size,
+            "count": count,
+            "data": os.path.basename(data_path),
+            "files": files,
+            "included": included
+        }
+        tmp_manifest = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # Processes that still map an older version keep their pages until they exit
+        for stale in glob.glob(os.path.join(self.output_dir, "negatives_*.npy")):
+            if os.path.basename(stale) != manifest["data"]:
+                os.remove(stale)
+
+        print(f"Built negative set v{manifest['version']}: {count} faces from {self.source_dir}")
+        return manifest
+
+    def _write_faces(self, files: List[Dict[str, Any]], path: str):
+        size = self.output_size
+        faces = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(len(files), size, size, 3))
+        count = 0
+        included = []
+        for file in files:
+            image_path = os.path.join(self.source_dir, file["name"])
+            # Read with OpenCV so negatives share the BGR layout of the aligned crops
+            image = cv2.imread(image_path)
+            if image is None:
+                print(f"Error loading image {image_path}")
+                continue
+            if image.shape[:2] != (size, size):
+                image = cv2.resize(image, (size, size))
+            faces[count] = image
+            included.append(file["name"])
+            count += 1
+
+        faces.flush()
+        del faces
+        if 0 < count < len(files):
+            # Unreadable files leave unused rows at the end; keep only the filled ones
+            compact_path = f"{path}.npy"
+            np.save(compact_path, np.load(path, mmap_mode='r')[:count])
+            os.replace(compact_path, path)
+        return count, included
+
+    def _data_path(self, manifest: Dict[str, Any]) -> str:
+        return os.path.join(self.output_dir, manifest["data"])
@@ -0,0 +1,63 @@
+import cv2
+import numpy as np
+
+# 64-bit DCT perceptual hashes of aligned face crops. Bursts of near-identical
+# selfies land within a few bits of each other, while a new pose, expression or
+# lighting change moves the hash much further, so hash clusters stand in for
+# "same shot" groups when trimming a member's training images.
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+
+def phash(faces: np.ndarray) -> np.ndarray:
+    hashes = np.zeros(len(faces), dtype=np.uint64)
+    for i, face in enumerate(faces):
+        gray = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if face.ndim == 3 else face
+        small = cv2.resize(gray, (DCT_SIZE, DCT_SIZE), interpolation=cv2.INTER_AREA)
+        low = cv2.dct(small.astype(np.float32))[:HASH_SIZE, :HASH_SIZE].flatten()
+        # The DC term only tracks overall brightness, so it stays out of the median
+        bits = low > np.median(low[1:])
+        hashes[i] = np.packbits(bits).view('>u8')[0]
+    return hashes
+
+def hamming_matrix(hashes: np.ndarray) -> np.ndarray:
+    hashes = np.ascontiguousarray(hashes, dtype=np.uint64)
+    xor = hashes[:, None] ^ hashes[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(len(hashes), len(hashes), 8), axis=-1).sum(axis=-1)
+
+def cluster(hashes: np.ndarray, threshold: int) -> np.ndarray:
+    # Leader clustering: each unassigned image claims every unassigned image within
+    # `threshold` bits of it. Order-dependent, but stable for a given image order.
+    labels = np.full(len(hashes), -1, dtype=np.int64)
+    if len(hashes) == 0:
+        return labels
+    close = hamming_matrix(hashes) <= threshold
+    for i in range(len(hashes)):
+        if labels[i] < 0:
+            labels[close[i] & (labels < 0)] = i
+    return labels
+
+def cap_near_duplicates(
+    hashes: np.ndarray,
+    threshold: int,
+    max_per_cluster: int,
+    max_total: int = 0
+) -> np.ndarray:
+    # Indices to keep, in original order: at most `max_per_cluster` images from each
+    # cluster (0 = no limit), then at most `max_total` overall (0 = no limit), taken
+    # round-robin across clusters so every pose keeps its share of the class
+    labels = cluster(hashes, threshold)
+    _, inverse = np.unique(labels, return_inverse=True)
+    seen = np.zeros(inverse.max() + 1 if len(inverse) else 0, dtype=np.int64)
+    rank = np.empty(len(inverse), dtype=np.int64)
+    for i, label in enumerate(inverse):
+        rank[i] = seen[label]
+        seen[label] += 1
+
+    keep = np.arange(len(inverse))
+    if max_per_cluster > 0:
+        keep = keep[rank < max_per_cluster]
+    if 0 < max_total < len(keep):
+        # Stable sort on rank: first image of every cluster, then the second, ...
+        keep = np.sort(keep[np.argsort(rank[keep], kind='stable')[:max_total]])
+    return keep.astype(np.int64)
@@ -1,13 +1,161 @@
 import os
+import threading
 import cv2
 import dlib
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Bump whenever align_face output changes so cached crops are not reused
+PREPROCESS_VERSION = 2
+
+# dlib's HOG detector keeps scratch state between calls, so every thread that
+# aligns faces (request handlers, loader pools, cache warm-up) gets its own
+_local = threading.local()
+
+def get_face_detector():
+    if not hasattr(_local, "face_detector"):
+        _local.face_detector = dlib.get_frontal_face_detector()
+    return _local.face_detector
+
+# The 68-point model is ~100 MB; load it once per process and only when needed.
+# That copy is shared, so calls into it go through the lock next to it.
+@lru_cache(maxsize=None)
+def get_landmark_predictor(landmark_path: str):
+    return dlib.shape_predictor(landmark_path), threading.Lock()
 
 class FacePreprocessor:
-    def __init__(self, landmark_path='shape_predictor_68_face_landmarks.dat'):
-        self.face_detector = dlib.get_frontal_face_detector()
-        self.landmark_predictor = dlib.shape_predictor(landmark_path)
+    def __init__(
+        self,
+        landmark_path='shape_predictor_68_face_landmarks.dat',
+        output_size: int = 224,
+        margin: float = 0.2,
+        detect_max_side: Optional[int] = None
+    ):
+        self.landmark_path = landmark_path
+        self.output_size = output_size
+        self.margin = margin
+        self.detect_max_side = detect_max_side
+
+    @property
+    def face_detector(self):
+        return get_face_detector()
+
+    @property
+    def landmark_predictor(self):
+        return get_landmark_predictor(self.landmark_path)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return {
+            "version": PREPROCESS_VERSION,
+            "landmark_model": os.path.basename(self.landmark_path),
+            "output_size": self.output_size,
+            "margin": self.margin,
+            "detect_max_side": self.detect_max_side,
+        }
+
+    @staticmethod
+    def _landmarks_array(shape) -> np.ndarray:
+        return np.fromiter(
+            (coord for point in shape.parts() for coord in (point.x, point.y)),
+            dtype=np.float32,
+            count=2 * shape.num_parts
+        ).reshape(-1, 2)
+
+    def _detect(self, image: np.ndarray):
+        if not self.detect_max_side or max(image.shape[:2]) <= self.detect_max_side:
+            faces = self.face_detector(image)
+            return max(faces, key=lambda rect: rect.width() * rect.height()) if faces else None
+
+        # Run HOG on a downscaled copy and map the box back to full resolution
+        scale = self.detect_max_side / max(image.shape[:2])
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        faces = self.face_detector(small)
+        if not faces:
+            return None
+        face = max(faces, key=lambda rect: rect.width() * rect.height())
+        return dlib.rectangle(
+            int(face.left() / scale), int(face.top() / scale),
+            int(face.right() / scale), int(face.bottom() / scale)
+        )
+
+    def _align_into(self, image: np.ndarray, out: np.ndarray, image_path: str = "") -> bool:
+        face = self._detect(image)
+        if face is None:
+            print(f"No faces detected in: {image_path}")
+            return False
+        
+        predictor, lock = self.landmark_predictor
+        with lock:
+            shape = predictor(image, face)
+        landmarks = self._landmarks_array(shape)
+        left_eye, right_eye = landmarks[36:48].reshape(2, 6, 2).mean(axis=1)
+        
+        angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
+        center = tuple(float(c) for c in (left_eye + right_eye) / 2)
+        rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+        
+        x, y, w, h = face.left(), face.top(), face.width(), face.height()
+        margin_w = int(self.margin * w)
+        margin_h = int(self.margin * h)
         
+        top = max(0, y - margin_h)
+        bottom = min(image.shape[0], y + h + margin_h)
+        left = max(0, x - margin_w)
+        right = min(image.shape[1], x + w + margin_w)
+        if bottom <= top or right <= left:
+            print(f"Face crop is empty in: {image_path}")
+            return False
+        
+        # Fold rotate -> crop -> resize into a single affine transform so only
+        # the face ROI is sampled instead of warping the full frame.
+        sx = self.output_size / (right - left)
+        sy = self.output_size / (bottom - top)
+        crop_matrix = np.array([[sx, 0, -left * sx], [0, sy, -top * sy]])
+        affine = crop_matrix @ np.vstack([rotation_matrix, [0, 0, 1]])
+        
+        cv2.warpAffine(
+            image, affine, (self.output_size, self.output_size),
+            dst=out, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT
+        )
+        return True
+
+    def align_face(self, image: np.ndarray, image_path: str = "") -> Optional[np.ndarray]:
+        out = np.empty((self.output_size, self.output_size, 3), dtype=np.uint8)
+        return out if self._align_into(image, out, image_path) else None
+
+    def preprocess_batch(
+        self,
+        image_paths: Sequence[str],
+        max_workers: int = 4
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        faces = np.zeros((len(image_paths), self.output_size, self.output_size, 3), dtype=np.uint8)
+        ok = np.zeros(len(image_paths), dtype=bool)
+
+        for i, image in enumerate(self._decode_ahead(image_paths, max_workers)):
+            if image is None:
+                print(f"Cannot read image: {image_paths[i]}")
+                continue
+            ok[i] = self._align_into(image, faces[i], image_paths[i])
+
+        return faces, ok
+
+    @staticmethod
+    def _decode_ahead(image_paths: Sequence[str], max_workers: int):
+        # cv2.imread releases the GIL, so decoding overlaps with detection. The
+        # lookahead is bounded to keep only a few full-resolution frames alive.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for image_path in image_paths:
+                pending.append(executor.submit(cv2.imread, image_path))
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
     def preprocess_image(self, image_path, output_folder="preprocess_image"):
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
@@ -22,43 +170,13 @@ class FacePreprocessor:
             
         # gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
-        faces = self.face_detector(image)
-        if not faces:
-            print(f"No faces detected in: {image_path}")
+        face_region = self.align_face(image, image_path)
+        if face_region is None:
             return None
-            
-        face = max(faces, key=lambda rect: rect.width() * rect.height())
-        
-        landmarks = self.landmark_predictor(image, face)
-        landmarks_points = np.array([[p.x, p.y] for p in landmarks.parts()])
-        
-        left_eye = np.mean(landmarks_points[36:42], axis=0)
-        right_eye = np.mean(landmarks_points[42:48], axis=0)
-        
-        angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
-        
-        center = tuple(np.mean([left_eye, right_eye], axis=0))
-        rotation_matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
-        aligned_image = cv2.warpAffine(image, rotation_matrix, (image.shape[1], image.shape[0]))
-        
-        x, y, w, h = face.left(), face.top(), face.width(), face.height()
-        margin_w = int(0.2 * w)
-        margin_h = int(0.2 * h)
-        
-        top = max(0, y - margin_h)
-        bottom = min(aligned_image.shape[0], y + h + margin_h)
-        left = max(0, x - margin_w)
-        right = min(aligned_image.shape[1], x + w + margin_w)
-        
-        face_region = aligned_image[top:bottom, left:right]
-        
-        face_region = cv2.resize(face_region, (224, 224))
         
         # face_region = cv2.cvtColor(face_region, cv2.COLOR_BGR2RGB)
         
-        face_region = face_region.astype(np.float32) / 255.0
-        
-        cv2.imwrite(save_path, (face_region * 255).astype(np.uint8)) 
+        cv2.imwrite(save_path, face_region) 
         print(f"Processed face saved to: {save_path}")
         
-        return face_region
\ No newline at end of file
+        return face_region.astype(np.float32) / 255.0
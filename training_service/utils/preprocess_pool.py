@@ -0,0 +1,110 @@
+import multiprocessing
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple
+from .preprocess import FacePreprocessor
+
+_worker_preprocessor: Optional[FacePreprocessor] = None
+
+def _init_worker(landmark_path: str, preprocess_kwargs: dict) -> None:
+    global _worker_preprocessor
+    # Parallelism comes from the pool itself; keep OpenCV single-threaded per worker
+    cv2.setNumThreads(1)
+    _worker_preprocessor = FacePreprocessor(landmark_path=landmark_path, **preprocess_kwargs)
+
+def _align_chunk(
+    shm_name: str,
+    shape: Tuple[int, ...],
+    chunk: List[Tuple[int, str]]
+) -> List[Tuple[int, bool]]:
+    shm = SharedMemory(name=shm_name)
+    faces = None
+    try:
+        faces = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        results = []
+        for index, image_path in chunk:
+            image = cv2.imread(image_path)
+            if image is None:
+                print(f"Cannot read image: {image_path}")
+                results.append((index, False))
+                continue
+            results.append((index, _worker_preprocessor._align_into(image, faces[index], image_path)))
+        return results
+    finally:
+        faces = None
+        shm.close()
+
+# Runs FacePreprocessor in worker processes, each loading its own dlib models once.
+# Workers write aligned crops straight into a shared-memory block, so only
+# (index, ok) pairs travel back through pickling.
+class ProcessPoolPreprocessor:
+    def __init__(
+        self,
+        landmark_path: str,
+        max_workers: int,
+        preprocess_kwargs: Optional[dict] = None,
+        block_size: int = 128,
+        chunk_size: int = 4
+    ):
+        preprocess_kwargs = preprocess_kwargs or {}
+        self.output_size = preprocess_kwargs.get("output_size", 224)
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(landmark_path, preprocess_kwargs)
+        )
+
+    def preprocess_batch(self, image_paths: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        faces = np.zeros((len(image_paths), self.output_size, self.output_size, 3), dtype=np.uint8)
+        ok = np.zeros(len(image_paths), dtype=bool)
+
+        # Work in fixed-size blocks so the shared segment stays small (Docker's
+        # default /dev/shm is only 64 MB).
+        for start in range(0, len(image_paths), self.block_size):
+            end = min(start + self.block_size, len(image_paths))
+            self._run_block(image_paths[start:end], faces[start:end], ok[start:end])
+
+        return faces, ok
+
+    def _run_block(self, image_paths: Sequence[str], faces: np.ndarray, ok: np.ndarray) -> None:
+        shape = faces.shape
+        shm = SharedMemory(create=True, size=max(1, faces.nbytes))
+        shared_faces = None
+        try:
+            shared_faces = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            indexed = list(enumerate(image_paths))
+            futures = [
+                self.executor.submit(_align_chunk, shm.name, shape, indexed[i:i + self.chunk_size])
+                for i in range(0, len(indexed), self.chunk_size)
+            ]
+
+            for future in futures:
+                for index, aligned in future.result():
+                    ok[index] = aligned
+
+            faces[...] = shared_faces
+        finally:
+            # The view must be released before the segment can be closed
+            shared_faces = None
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+
+_pools: Dict[Tuple[str, int, tuple], ProcessPoolPreprocessor] = {}
+
+def get_process_preprocessor(
+    landmark_path: str,
+    max_workers: int,
+    preprocess_kwargs: Optional[dict] = None
+) -> ProcessPoolPreprocessor:
+    key = (landmark_path, max_workers, tuple(sorted((preprocess_kwargs or {}).items())))
+    if key not in _pools:
+        _pools[key] = ProcessPoolPreprocessor(landmark_path, max_workers, preprocess_kwargs)
+    return _pools[key]
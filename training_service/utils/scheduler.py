@@ -0,0 +1,166 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import multiprocessing
+from dataclasses import dataclass, asdict, replace
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import TrainingConfig
+
+logger = logging.getLogger(__name__)
+
+_worker_trainer = None
+_progress_queue = None
+
+def _init_training_worker(intra_op_threads: int, inter_op_threads: int, progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    # Thread budgets must be set before TensorFlow/OpenCV create their pools
+    for name in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(intra_op_threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter_op_threads)
+
+    import cv2
+    import tensorflow as tf
+
+    cv2.setNumThreads(intra_op_threads)
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+def _run_training_job(course_id: int, engine: str, config: Dict[str, Any]) -> None:
+    global _worker_trainer
+    from .trainer import ModelTrainer
+
+    _progress_queue.put(("running", course_id, time.time()))
+    if _worker_trainer is None:
+        _worker_trainer = ModelTrainer()
+    _worker_trainer.config = TrainingConfig(**config)
+    asyncio.run(_worker_trainer.train_course_model(course_id, engine=engine))
+
+@dataclass
+class TrainingJob:
+    course_id: int
+    engine: str = "softmax"
+    changed: bool = True
+    size: int = 0
+    status: str = "queued"
+    queued_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+# Runs course trainings concurrently in spawned worker processes, each with its
+# own TensorFlow/OpenCV thread budget. Changed courses go first, largest first,
+# so the long jobs start early and the nightly run packs into the window.
+class TrainingScheduler:
+    def __init__(self):
+        self.jobs: Dict[int, TrainingJob] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running = False
+
+    @staticmethod
+    def order(jobs: List[TrainingJob]) -> List[TrainingJob]:
+        return sorted(jobs, key=lambda job: (not job.changed, -job.size, job.course_id))
+
+    @staticmethod
+    def thread_budget(config: TrainingConfig) -> int:
+        if config.threads_per_training > 0:
+            return config.threads_per_training
+        return max(1, (os.cpu_count() or 1) // config.parallel_trainings)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = [asdict(job) for job in self.jobs.values()]
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"running": self._running, "total": len(jobs), "counts": counts, "jobs": jobs}
+
+    def run(
+        self,
+        jobs: List[TrainingJob],
+        config: TrainingConfig,
+        on_finished: Optional[Callable[[int], None]] = None,
+        wait: bool = False
+    ) -> Dict[str, Any]:
+        with self._lock:
+            if self._running and wait:
+                # Queue behind the active run (e.g. a manual training) instead of failing
+                logger.info(f"Waiting for the active training run before starting {len(jobs)} jobs")
+                self._idle.wait_for(lambda: not self._running)
+            if self._running:
+                raise RuntimeError("A training run is already in progress")
+            self._running = True
+            now = time.time()
+            self.jobs = {job.course_id: replace(job, status="queued", queued_at=now) for job in jobs}
+
+        threads = self.thread_budget(config)
+        # Workers already share the CPU between them; keep preprocessing inside each
+        # worker on threads within the same budget instead of nesting process pools.
+        worker_config = asdict(replace(config, preprocess_executor="thread", preprocess_workers=threads))
+
+        context = multiprocessing.get_context("spawn")
+        progress_queue = context.Queue()
+        logger.info(
+            f"Training {len(jobs)} courses with {config.parallel_trainings} workers "
+            f"x {threads} threads"
+        )
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=config.parallel_trainings,
+                mp_context=context,
+                initializer=_init_training_worker,
+                initargs=(threads, config.inter_op_threads, progress_queue)
+            ) as executor:
+                pending = {
+                    executor.submit(_run_training_job, job.course_id, job.engine, worker_config): job.course_id
+                    for job in self.order(list(self.jobs.values()))
+                }
+                while pending:
+                    done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                    self._drain(progress_queue)
+                    for future in done:
+                        course_id = pending.pop(future)
+                        self._finish(course_id, future.exception())
+                        if on_finished is not None:
+                            on_finished(course_id)
+                self._drain(progress_queue)
+        finally:
+            with self._lock:
+                self._running = False
+                self._idle.notify_all()
+
+        return self.status()
+
+    def _drain(self, progress_queue) -> None:
+        while True:
+            try:
+                status, course_id, timestamp = progress_queue.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                job = self.jobs.get(course_id)
+                if job is not None and job.status == "queued":
+                    job.status = status
+                    job.started_at = timestamp
+
+    def _finish(self, course_id: int, error: Optional[BaseException]) -> None:
+        with self._lock:
+            job = self.jobs[course_id]
+            job.finished_at = time.time()
+            job.status = "failed" if error else "done"
+            job.error = str(error) if error else None
+            finished = sum(job.status in ("done", "failed") for job in self.jobs.values())
+            total = len(self.jobs)
+
+        if error:
+            logger.error(f"[{finished}/{total}] Training failed for course {course_id}: {error}")
+        else:
+            logger.info(f"[{finished}/{total}] Training finished for course {course_id}")
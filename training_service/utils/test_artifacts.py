@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from utils import artifacts
+from utils.artifacts import ArtifactStore, MANIFEST_KEY, apply_delta, delta_manifest, read_artifact
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # 64-byte chunks so a small tensor spans several of them
+    monkeypatch.setattr(artifacts, "CHUNK_BYTES", 64)
+
+def write_gallery(path, embeddings):
+    np.savez(path, embeddings=embeddings, labels=np.arange(len(embeddings)))
+
+def publish(tmp_path, version, embeddings, label_map=None):
+    store = ArtifactStore(root=str(tmp_path / "artifacts"))
+    model_path = str(tmp_path / f"gallery_v{version}.npz")
+    write_gallery(model_path, embeddings)
+    return store, store.publish(1, version, "embedding", model_path, label_map or {0: 10})
+
+def load(path):
+    with open(path, "rb") as f:
+        return read_artifact(f.read())
+
+def test_delta_only_carries_changed_chunks(tmp_path):
+    v1 = np.zeros((32, 4), dtype=np.float32)
+    v2 = v1.copy()
+    v2[-1] = 1.0
+    store, _ = publish(tmp_path, 1, v1)
+    full_path, _ = store.delta_path(1, 0)
+    base = apply_delta({}, load(full_path))
+
+    publish(tmp_path, 2, v2, {0: 10, 1: 11})
+    delta_path, manifest = store.delta_path(1, 1)
+    delta = load(delta_path)
+
+    changed = [name for name in delta if name != MANIFEST_KEY]
+    assert changed == ["embeddings#7"]
+    result = apply_delta(base, delta)
+    np.testing.assert_array_equal(result["embeddings"], v2)
+    assert manifest["version"] == 2
+    assert delta_manifest(delta)["label_map"] == {"0": 10, "1": 11}
+
+def test_checksum_mismatch_is_rejected(tmp_path):
+    store, _ = publish(tmp_path, 1, np.zeros((32, 4), dtype=np.float32))
+    delta = load(store.delta_path(1, 0)[0])
+    delta["embeddings#0"] = delta["embeddings#0"] + 1
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        apply_delta({}, delta)
+
+def test_tampered_manifest_is_rejected(tmp_path):
+    store, _ = publish(tmp_path, 1, np.zeros((4, 4), dtype=np.float32))
+    delta = load(store.delta_path(1, 0)[0])
+    manifest = delta[MANIFEST_KEY].tobytes().replace(b'"0": 10', b'"0": 99')
+    delta[MANIFEST_KEY] = np.frombuffer(manifest, dtype=np.uint8)
+
+    with pytest.raises(ValueError, match="corrupted"):
+        apply_delta({}, delta)
+
+def test_missing_base_chunk_is_rejected(tmp_path):
+    v1 = np.zeros((32, 4), dtype=np.float32)
+    store, _ = publish(tmp_path, 1, v1)
+    v2 = v1.copy()
+    v2[0] = 1.0
+    publish(tmp_path, 2, v2)
+    delta = load(store.delta_path(1, 1)[0])
+
+    with pytest.raises(ValueError, match="missing chunk"):
+        apply_delta({}, delta)
+
+def test_versions_are_never_reused(tmp_path):
+    publish(tmp_path, 1, np.zeros((4, 4), dtype=np.float32))
+    # Same weights again is a no-op republish
+    publish(tmp_path, 1, np.zeros((4, 4), dtype=np.float32))
+
+    with pytest.raises(ValueError):
+        publish(tmp_path, 1, np.ones((4, 4), dtype=np.float32))
+    publish(tmp_path, 2, np.ones((4, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        publish(tmp_path, 1, np.zeros((4, 4), dtype=np.float32))
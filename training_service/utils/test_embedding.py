@@ -0,0 +1,68 @@
+import numpy as np
+
+from utils.embedding import CourseGallery, DEFAULT_THRESHOLD, l2_normalize
+
+def unit(*values):
+    return l2_normalize(np.array([values], dtype=np.float32))
+
+def make_gallery():
+    gallery = CourseGallery(dim=3, capacity=2)
+    gallery.add(1, np.vstack([unit(1, 0, 0), unit(0.9, 0.1, 0)]), "fp1")
+    gallery.add(2, unit(0, 1, 0), "fp2")
+    return gallery
+
+def test_add_grows_past_capacity():
+    gallery = make_gallery()
+
+    assert gallery.size == 3
+    assert gallery.members == [1, 2]
+    assert list(gallery.labels[:gallery.size]) == [1, 1, 2]
+
+def test_remove_compacts_rows():
+    gallery = make_gallery()
+    gallery.remove([1])
+
+    assert gallery.size == 1
+    assert gallery.members == [2]
+    np.testing.assert_allclose(gallery.embeddings[:1], unit(0, 1, 0))
+
+def test_recognize_votes_and_thresholds():
+    gallery = make_gallery()
+    queries = np.vstack([unit(1, 0.05, 0), unit(0, 1, 0.1), unit(0, 0, 1)])
+
+    results = gallery.recognize(queries, k=3, threshold=0.5)
+
+    assert results[0][0] == 1
+    assert results[1][0] == 2
+    assert results[2][0] is None
+    assert results[0][1] > 0.99
+
+def test_recognize_on_empty_gallery():
+    assert CourseGallery(dim=3).recognize(unit(1, 0, 0)) == [(None, 0.0)]
+
+def test_calibrate_rejects_negatives():
+    gallery = make_gallery()
+    negatives = l2_normalize(np.random.default_rng(0).normal(size=(200, 3)).astype(np.float32))
+
+    threshold = gallery.calibrate(negatives, false_accept_rate=0.05)
+
+    accepted = [label for label, _ in gallery.recognize(negatives) if label is not None]
+    assert gallery.threshold == threshold
+    assert len(accepted) <= 0.05 * len(negatives) + 1
+
+def test_calibrate_without_negatives_keeps_threshold():
+    gallery = make_gallery()
+
+    assert gallery.calibrate(np.empty((0, 3), dtype=np.float32)) == DEFAULT_THRESHOLD
+
+def test_save_and_load_keep_threshold(tmp_path):
+    gallery = make_gallery()
+    gallery.threshold = 0.8
+    path = str(tmp_path / "gallery.npz")
+    gallery.save(path)
+
+    loaded = CourseGallery.load(path)
+
+    assert loaded.size == 3
+    assert loaded.fingerprints == {1: "fp1", 2: "fp2"}
+    assert abs(loaded.threshold - 0.8) < 1e-6
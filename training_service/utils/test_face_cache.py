@@ -0,0 +1,74 @@
+import os
+import numpy as np
+
+from utils.face_cache import FaceCache
+
+def face(value, size=8):
+    return np.full((size, size, 3), value, dtype=np.uint8)
+
+def entry_bytes(tmp_path):
+    probe = FaceCache(str(tmp_path / "probe"))
+    probe.put(probe.key_for_bytes(b"probe"), face(0))
+    return probe.scan_size()
+
+def test_put_get_roundtrip(tmp_path):
+    cache = FaceCache(str(tmp_path), params={"output_size": 8})
+    key = cache.key_for_bytes(b"image")
+
+    assert cache.get(key) is None
+    cache.put(key, face(7))
+
+    np.testing.assert_array_equal(cache.get(key), face(7))
+
+def test_key_depends_on_params(tmp_path):
+    a = FaceCache(str(tmp_path / "a"), params={"output_size": 8})
+    b = FaceCache(str(tmp_path / "b"), params={"output_size": 16})
+
+    assert a.key_for_bytes(b"image") != b.key_for_bytes(b"image")
+
+def test_size_counter_tracks_overwrites(tmp_path):
+    cache = FaceCache(str(tmp_path))
+    key = cache.key_for_bytes(b"image")
+
+    cache.put(key, face(1))
+    cache.put(key, face(2))
+    cache.put(cache.key_for_bytes(b"other"), face(3))
+
+    with open(os.path.join(str(tmp_path), "size")) as f:
+        assert int(f.read()) == cache.scan_size()
+
+def test_counter_is_shared_between_instances(tmp_path):
+    first = FaceCache(str(tmp_path))
+    first.put(first.key_for_bytes(b"a"), face(1))
+    second = FaceCache(str(tmp_path))
+    second.put(second.key_for_bytes(b"b"), face(2))
+
+    with open(os.path.join(str(tmp_path), "size")) as f:
+        assert int(f.read()) == second.scan_size()
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FaceCache(str(tmp_path / "cache"), max_bytes=int(entry_bytes(tmp_path) * 2.5))
+    keys = [cache.key_for_bytes(bytes([i])) for i in range(3)]
+    cache.put(keys[0], face(0))
+    cache.put(keys[1], face(1))
+    # Make the first entry clearly the oldest
+    os.utime(cache._path(keys[0]), (1, 1))
+    cache.put(keys[2], face(2))
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[1]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.scan_size() <= cache.max_bytes
+
+def test_eviction_tolerates_entries_removed_by_another_process(tmp_path):
+    cache = FaceCache(str(tmp_path), max_bytes=1)
+    real_entries = cache._entries
+
+    def entries():
+        # Another process deleted this entry between the scan and the stat/remove
+        yield os.path.join(str(tmp_path), "ab", "gone.npy"), 0.0, 128
+        yield from real_entries()
+
+    cache._entries = entries
+    cache.put(cache.key_for_bytes(b"a"), face(1))
+    cache.put(cache.key_for_bytes(b"b"), face(2))
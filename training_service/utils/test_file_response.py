@@ -0,0 +1,94 @@
+import asyncio
+
+from starlette.requests import Request
+
+from utils.file_response import ETagCache, _etag_matches, _parse_range, file_response
+
+BODY = bytes(range(100))
+
+def test_parse_range():
+    assert _parse_range("bytes=0-9", 100) == (0, 9)
+    assert _parse_range("bytes=90-", 100) == (90, 99)
+    assert _parse_range("bytes=90-200", 100) == (90, 99)
+    assert _parse_range("bytes=-10", 100) == (90, 99)
+    assert _parse_range("bytes=-200", 100) == (0, 99)
+    assert _parse_range("bytes=-0", 100) == (100, 99)
+    assert _parse_range("bytes=-", 100) is None
+    assert _parse_range("bytes=0-9,20-29", 100) is None
+    assert _parse_range("items=0-9", 100) is None
+
+def test_etag_matches():
+    assert _etag_matches('"abc"', '"abc"')
+    assert _etag_matches('"x", W/"abc"', '"abc"')
+    assert _etag_matches("*", '"abc"')
+    assert not _etag_matches('"abcd"', '"abc"')
+
+def test_etag_cache_follows_file_changes(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(b"v1")
+    cache = ETagCache()
+    first = cache.get(str(path), path.stat())
+
+    assert cache.get(str(path), path.stat()) == first
+    path.write_bytes(b"v2 longer")
+    assert cache.get(str(path), path.stat()) != first
+
+def request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/download",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+def fetch(path, **headers):
+    async def run():
+        response = await file_response(request(**headers), str(path), filename="model.bin", etag='"v1"')
+        body = b""
+        if hasattr(response, "body_iterator"):
+            async for chunk in response.body_iterator:
+                body += chunk
+        return response, body
+    return asyncio.run(run())
+
+def model_file(tmp_path):
+    path = tmp_path / "model.bin"
+    path.write_bytes(BODY)
+    return path
+
+def test_full_body(tmp_path):
+    response, body = fetch(model_file(tmp_path))
+
+    assert response.status_code == 200
+    assert body == BODY
+    assert response.headers["etag"] == '"v1"'
+
+def test_if_none_match_returns_304(tmp_path):
+    response, _ = fetch(model_file(tmp_path), if_none_match='"v1"')
+
+    assert response.status_code == 304
+
+def test_range_returns_partial_body(tmp_path):
+    response, body = fetch(model_file(tmp_path), range="bytes=10-19")
+
+    assert response.status_code == 206
+    assert body == BODY[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+
+def test_stale_if_range_returns_full_body(tmp_path):
+    response, body = fetch(model_file(tmp_path), range="bytes=10-19", if_range='"v0"')
+
+    assert response.status_code == 200
+    assert body == BODY
+
+def test_matching_if_range_returns_partial_body(tmp_path):
+    response, body = fetch(model_file(tmp_path), range="bytes=90-", if_range='"v1"')
+
+    assert response.status_code == 206
+    assert body == BODY[90:]
+
+def test_unsatisfiable_range(tmp_path):
+    response, _ = fetch(model_file(tmp_path), range="bytes=200-300")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
@@ -0,0 +1,44 @@
+import numpy as np
+
+from utils.member_store import MemberFeatureStore
+
+IMAGES = [{"id": 1, "file_path": "/media/a.jpg"}, {"id": 2, "file_path": "/media/b.jpg"}]
+
+def test_fingerprint_ignores_order_and_tracks_changes():
+    base = MemberFeatureStore.fingerprint(IMAGES)
+
+    assert MemberFeatureStore.fingerprint(list(reversed(IMAGES))) == base
+    assert MemberFeatureStore.fingerprint(IMAGES[:1]) != base
+    assert MemberFeatureStore.fingerprint(IMAGES + [{"id": 3, "file_path": "/media/c.jpg"}]) != base
+    assert MemberFeatureStore.fingerprint([{**IMAGES[0], "file_path": "/media/new.jpg"}, IMAGES[1]]) != base
+    assert MemberFeatureStore.fingerprint(IMAGES, {"output_size": 160}) != base
+
+def test_load_misses_after_image_set_changes(tmp_path):
+    store = MemberFeatureStore(store_dir=str(tmp_path))
+    fingerprint = MemberFeatureStore.fingerprint(IMAGES)
+    faces = np.arange(12, dtype=np.uint8).reshape(2, 2, 3)
+    store.save(7, "faces", fingerprint, [1, 2], faces)
+
+    loaded, image_ids = store.load(7, "faces", fingerprint)
+    np.testing.assert_array_equal(loaded, faces)
+    assert image_ids == [1, 2]
+
+    assert store.load(7, "faces", MemberFeatureStore.fingerprint(IMAGES[:1])) is None
+
+def test_entries_survive_a_new_store_instance(tmp_path):
+    fingerprint = MemberFeatureStore.fingerprint(IMAGES)
+    MemberFeatureStore(store_dir=str(tmp_path)).save(7, "phash", fingerprint, [1, 2], np.array([1, 2], dtype=np.uint64))
+
+    loaded, image_ids = MemberFeatureStore(store_dir=str(tmp_path)).load(7, "phash", fingerprint)
+
+    np.testing.assert_array_equal(loaded, [1, 2])
+    assert image_ids == [1, 2]
+
+def test_memory_cache_is_bounded(tmp_path):
+    store = MemberFeatureStore(store_dir=str(tmp_path), max_memory_bytes=100)
+    for member_id in range(3):
+        store.save(member_id, "faces", "fp", [member_id], np.zeros(80, dtype=np.uint8))
+
+    assert store._memory_bytes <= 100
+    # Evicted from memory, still on disk
+    assert store.load(0, "faces", "fp") is not None
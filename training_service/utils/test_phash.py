@@ -0,0 +1,62 @@
+import numpy as np
+
+from utils.phash import phash, hamming_matrix, cluster, cap_near_duplicates
+
+def pattern(seed, size=64):
+    rng = np.random.default_rng(seed)
+    # Kept below 200 so a brightness shift never clips
+    small = rng.integers(0, 200, size=(8, 8, 3), dtype=np.uint8)
+    return np.kron(small, np.ones((size // 8, size // 8, 1), dtype=np.uint8))
+
+def test_near_identical_faces_hash_close():
+    base = pattern(0)
+    brighter = base + 10
+    hashes = phash(np.stack([base, brighter, pattern(1)]))
+
+    distances = hamming_matrix(hashes)
+    assert distances[0, 1] <= 4
+    assert distances[0, 2] > 10
+
+def test_hamming_matrix():
+    hashes = np.array([0b0000, 0b0111, 0xFFFFFFFFFFFFFFFF], dtype=np.uint64)
+
+    distances = hamming_matrix(hashes)
+
+    assert distances[0, 1] == 3
+    assert distances[0, 2] == 64
+    assert distances[1, 2] == 61
+    assert (np.diag(distances) == 0).all()
+
+def test_cluster_groups_within_threshold():
+    hashes = np.array([0b0, 0b1, 0xFF00, 0xFF01, 0xFFFFFFFF], dtype=np.uint64)
+
+    labels = cluster(hashes, threshold=2)
+
+    assert labels[0] == labels[1]
+    assert labels[2] == labels[3]
+    assert len(set(labels.tolist())) == 3
+
+def test_cap_near_duplicates_keeps_first_of_each_cluster():
+    hashes = np.array([0b0, 0b1, 0b11, 0xFF00, 0xFF01], dtype=np.uint64)
+
+    keep = cap_near_duplicates(hashes, threshold=2, max_per_cluster=2)
+
+    assert keep.tolist() == [0, 1, 3, 4]
+
+def test_member_cap_spreads_across_clusters():
+    # Three shots of one pose, two of another, one of a third
+    hashes = np.array([0b0, 0b1, 0b10, 0xFF00, 0xFF01, 0xFFFFFFFF], dtype=np.uint64)
+
+    keep = cap_near_duplicates(hashes, threshold=2, max_per_cluster=0, max_total=4)
+
+    # One of each pose first, then the second shot of the earliest poses
+    assert keep.tolist() == [0, 1, 3, 5]
+
+def test_both_caps_combine():
+    hashes = np.array([0b0, 0b1, 0b10, 0xFF00, 0xFF01, 0xFFFFFFFF], dtype=np.uint64)
+
+    assert cap_near_duplicates(hashes, threshold=2, max_per_cluster=1, max_total=0).tolist() == [0, 3, 5]
+    assert cap_near_duplicates(hashes, threshold=2, max_per_cluster=2, max_total=10).tolist() == [0, 1, 3, 4, 5]
+
+def test_cap_near_duplicates_handles_empty_input():
+    assert cap_near_duplicates(np.array([], dtype=np.uint64), threshold=2, max_per_cluster=2).tolist() == []
@@ -0,0 +1,259 @@
+import os
+import json
+import logging
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from .data_loader import DataLoader
+from .embedding import EmbeddingModel, CourseGallery
+from .config import TrainingConfig, ENGINES
+from .export import EXPORT_FORMATS
+from .artifacts import ArtifactStore
+
+class ModelTrainer:
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.embedding_model = EmbeddingModel()
+        self.config = TrainingConfig()
+        self.artifact_store = ArtifactStore()
+        self._negatives = None
+        self._negatives_key = None
+        
+    async def train_course_model(self, course_id: int, engine: str = "softmax") -> None:
+        try:
+            if engine not in ENGINES:
+                raise ValueError(f"Unknown training engine '{engine}'")
+
+            loader = DataLoader(
+                base_url="http://app:8000",
+                max_workers=self.config.preprocess_workers,
+                executor=self.config.preprocess_executor
+            )
+            loader.authenticate("a", "a")
+
+            # Course revision moves on every enrollment or training image change
+            revisions = loader.api_client.make_request(
+                loader.api_client.endpoints.course_revisions,
+                params={'course_id': course_id}
+            )
+
+            if not revisions:
+                self.logger.warning(f"Skipping training for course {course_id} - Unable to fetch course revision")
+                return
+
+            revision = revisions[0]['revision']
+            enrollment_count = revisions[0]['enrollment_count']
+
+            # ดึง FaceModel ของ course_id
+            existing_models = loader.api_client.make_request(
+                loader.api_client.endpoints.face_model,
+                params={'course_id': course_id}
+            )
+
+            if existing_models and existing_models.get('results', []):
+                face_model = existing_models['results'][0]
+
+                if face_model.get("trained_revision", 0) >= revision and face_model.get("engine", "softmax") == engine:
+                    self.logger.info(f"Skipping training for course {course_id} - Already trained at revision {revision}")
+                    return
+
+            model_path = f"models/course_{course_id}.keras"
+            label_map = f"models/label_map_{course_id}.json"
+
+            os.makedirs(os.path.dirname(model_path), exist_ok=True)
+
+            exports: Dict[str, str] = {}
+            if engine == "embedding":
+                model_path = f"models/gallery_{course_id}.npz"
+                inverse_label_map = self._build_gallery(loader, course_id, model_path)
+            else:
+                # Only a model this course last trained with softmax matches its label map file
+                warm_start = bool(
+                    existing_models and existing_models.get('results', [])
+                    and face_model.get("engine", "softmax") == "softmax"
+                )
+                inverse_label_map, exports = self._train_softmax(
+                    loader, course_id, model_path, label_map if warm_start else None
+                )
+
+            if not inverse_label_map:
+                self.logger.info(f"Skipping training for course {course_id} - No training data found")
+                return
+
+            # อัปเดตค่า Enrollment ล่าสุดที่ใช้เทรน
+            model_data = {
+                "course": course_id,
+                "description": "",
+                "model_path": model_path,
+                "inverse_label_map": label_map,
+                "last_enrollment_count": enrollment_count,
+                "trained_revision": revision,
+                "engine": engine
+            }
+            # Clear exports left over from an earlier version that are no longer produced
+            for fmt in EXPORT_FORMATS:
+                model_data[f"{fmt}_path"] = exports.get(fmt, "")
+
+            has_model = bool(existing_models and existing_models.get('results', []))
+            model_data['model_version'] = face_model.get('model_version', 0) + 1 if has_model else 1
+
+            # The label map matches the model file that training just wrote
+            with open(label_map, 'w') as f:
+                json.dump(inverse_label_map, f)
+
+            if has_model:
+                response = loader.api_client.make_request(
+                    f"{loader.api_client.endpoints.face_model}{face_model['id']}/",
+                    method='patch',
+                    json=model_data
+                )
+            else:
+                response = loader.api_client.make_request(
+                    loader.api_client.endpoints.face_model,
+                    method='post',
+                    json=model_data
+                )
+
+            if not response:
+                # Without the FaceModel row the version was never taken; publishing it
+                # would let the next run reuse the number for different weights
+                self.logger.error(f"Could not save FaceModel v{model_data['model_version']} for course {course_id}")
+                return
+
+            # Only a version the API has recorded is published to devices
+            try:
+                self.artifact_store.publish(
+                    course_id, model_data['model_version'], engine, model_path, inverse_label_map
+                )
+            except Exception as e:
+                self.logger.warning(f"Could not publish delta artifact for course {course_id}: {e}")
+
+            self.logger.info(f"Successfully trained {engine} model for course {course_id} - {enrollment_count} enrollments")
+
+        except Exception as e:
+            self.logger.error(f"Error training model for course {course_id}: {str(e)}")
+            raise
+
+    def _train_softmax(
+        self, loader: DataLoader, course_id: int, model_path: str, previous_label_map: Optional[str] = None
+    ) -> Tuple[Dict[int, Any], Dict[str, str]]:
+        # TensorFlow is only imported once a softmax model actually needs training
+        from .model import FaceRecognitionModel
+        from .export import export_model
+
+        # โหลดข้อมูลการฝึก
+        X, y, inverse_label_map = loader.load_course_data(
+            course_id=course_id,
+            streaming=self.config.streaming_dataset,
+            memmap_dir=self.config.dataset_memmap_dir or None,
+            near_duplicate_threshold=self.config.near_duplicate_threshold,
+            near_duplicate_cap=self.config.near_duplicate_cap,
+            member_image_cap=self.config.member_image_cap
+        )
+        if X.size == 0 or y.size == 0:
+            return {}, {}
+
+        warm_start = {}
+        if self.config.warm_start and previous_label_map:
+            column_map = self._column_map(model_path, previous_label_map, inverse_label_map)
+            if column_map is not None:
+                warm_start = {
+                    "warm_start_path": model_path,
+                    "column_map": column_map,
+                    "warm_start_epochs": self.config.warm_start_epochs,
+                    "warm_start_learning_rate": self.config.warm_start_learning_rate
+                }
+
+        model = FaceRecognitionModel(num_classes=len(set(y)))
+        trained_model, history = model.train(
+            X, y,
+            model_path=model_path,
+            pipeline=self.config.input_pipeline,
+            cache_dataset=self.config.cache_dataset,
+            feature_draws=self.config.feature_draws,
+            **warm_start
+        )
+        images_per_sec = history.history.get('images_per_sec', [])
+        if images_per_sec:
+            self.logger.info(
+                f"Course {course_id} trained with {self.config.input_pipeline} pipeline - "
+                f"{sum(images_per_sec) / len(images_per_sec):.1f} images/sec"
+            )
+
+        # Quantized artifacts for the CPU-only door devices, calibrated on this course's faces
+        exports = export_model(
+            model_path, X, self.config.export_format_list,
+            calibration_size=self.config.export_calibration_size
+        )
+        return inverse_label_map, exports
+
+    def _column_map(
+        self, model_path: str, previous_label_map: str, inverse_label_map: Dict[int, Any]
+    ) -> Optional[List[int]]:
+        if not os.path.exists(model_path) or not os.path.exists(previous_label_map):
+            return None
+
+        with open(previous_label_map, 'r') as f:
+            # JSON turns the member ids (and "unknown") into strings on one side only
+            previous = {str(label): int(index) for index, label in json.load(f).items()}
+
+        column_map = [previous.get(str(inverse_label_map[index]), -1) for index in range(len(inverse_label_map))]
+        if all(column < 0 for column in column_map):
+            return None
+        return column_map
+
+    def _build_gallery(self, loader: DataLoader, course_id: int, gallery_path: str) -> Dict[int, Any]:
+        by_member = loader.group_by_member(loader.fetch_training_images(course_id))
+        if not by_member:
+            return {}
+
+        if os.path.exists(gallery_path):
+            gallery = CourseGallery.load(gallery_path)
+        else:
+            gallery = CourseGallery(dim=self.embedding_model.dim)
+
+        # Only members that left the course or whose images changed are dropped,
+        # and only new or changed members are embedded and appended.
+        fingerprints = {
+            member_id: loader.embedding_fingerprint(member_images, self.embedding_model)
+            for member_id, member_images in by_member.items()
+        }
+        gallery.remove(
+            member_id for member_id in gallery.members
+            if gallery.fingerprints[member_id] != fingerprints.get(member_id)
+        )
+
+        to_add = {
+            member_id: member_images
+            for member_id, member_images in by_member.items()
+            if member_id not in gallery.fingerprints
+        }
+        for member_id, (fingerprint, embeddings) in loader.load_member_embeddings(to_add, self.embedding_model).items():
+            gallery.add(member_id, embeddings, fingerprint)
+
+        if self.config.embedding_threshold > 0:
+            gallery.threshold = self.config.embedding_threshold
+        else:
+            # Calibrated against the shared unknown faces, which no member should match
+            gallery.calibrate(
+                self._negative_embeddings(loader),
+                false_accept_rate=self.config.embedding_false_accept_rate
+            )
+
+        gallery.save(gallery_path)
+        self.logger.info(
+            f"Gallery for course {course_id}: {gallery.size} embeddings, {len(to_add)} members updated, "
+            f"threshold {gallery.threshold:.3f}"
+        )
+        return {idx: member_id for idx, member_id in enumerate(gallery.members)}
+
+    def _negative_embeddings(self, loader: DataLoader) -> np.ndarray:
+        # The negative set only changes when its source folder does, so its
+        # embeddings are kept for as long as the manifest digest stays the same
+        negatives = loader.negative_set.load()
+        manifest = loader.negative_set.read_manifest() or {}
+        key = (manifest.get("digest"), self.embedding_model.name)
+        if self._negatives_key != key:
+            self._negatives = self.embedding_model.embed(negatives)
+            self._negatives_key = key
+        return self._negatives